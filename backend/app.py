@@ -1,27 +1,160 @@
-from fastapi import FastAPI, HTTPException, Body, File, UploadFile, Query, Form
+from fastapi import FastAPI, HTTPException, Body, File, UploadFile, Query, Form, Request, WebSocket, WebSocketDisconnect
 from starlette.middleware.cors import CORSMiddleware
-from firebase_config import db
-from io import BytesIO
-import PyPDF2
+from starlette.middleware.gzip import GZipMiddleware
+import importlib.util
 import os
 import json
-from openai import OpenAI
 from dotenv import load_dotenv
 import httpx
-from firebase_admin import firestore
 from pydantic import BaseModel
-from gradescopeapi.classes.connection import GSConnection
+from gradescope_session import GradescopeSessionManager
 import asyncio
+import logging
+import hashlib
+import re
+import time
 from typing import Optional, Union
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi import status
+from contextlib import asynccontextmanager
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from log_config import configure_logging
+from metrics import MetricsMiddleware, render_metrics, span
+from canvas_client import CanvasClient
+from canvas_cache import build_canvas_cache
+from canvas_throttle import CanvasThrottle, canvas_priority, BACKGROUND
+from canvas_pagination import fetch_all_pages
+from course_matcher import CourseMatcher
+from syllabus_cache import SyllabusParseCache, pdf_key, text_key
+from syllabus_jobs import SyllabusJob, SyllabusJobQueue, QueueFullError
+from pdf_extract import PdfExtractor, spool_upload, remove_spooled
+from rate_limit import TokenBucket
+from sync_scheduler import SyncScheduler
+from canvas_terms import detect_current_term, term_has_ended
+from single_flight import SingleFlight
+from records import AssignmentRecord, project_canvas_assignments, project_course
+from write_buffer import WriteBehindBuffer
+from grade_events import GradeEventHub
+from grade_engine import GradeEngine
+from executors import run_firestore, run_gradescope, run_openai, executor_stats, shutdown_executors
+from providers import LazyClient, firestore_provider, openai_provider, warm_providers, provider_stats, close_providers
 
 
 load_dotenv()
 env = os.environ
 
-app = FastAPI()
+configure_logging(env.get('LOG_LEVEL', 'INFO'), json_format=env.get('LOG_FORMAT', 'json') == 'json')
+logger = logging.getLogger(__name__)
+
+CANVAS_API_URL = env.get('CANVAS_API_URL', "https://bcourses.berkeley.edu/api/v1")
+PAT = env.get('PAT')
+CANVAS_PAGE_CONCURRENCY = int(env.get('CANVAS_PAGE_CONCURRENCY', 4))
+COURSES_REFRESH_INTERVAL = int(env.get('COURSES_REFRESH_INTERVAL', 24 * 3600))
+# Also build the OpenAI client in the background at startup instead of on first use
+PRELOAD_CLIENTS = env.get('PRELOAD_CLIENTS', '').lower() in ('1', 'true', 'yes')
+
+# Firebase Admin is loaded by the lifespan, off the event loop, not at import
+db = LazyClient(firestore_provider)
+
+canvas = CanvasClient(
+    PAT,
+    http2=env.get('CANVAS_HTTP2', '').lower() in ('1', 'true', 'yes'),
+    timeout=float(env.get('CANVAS_TIMEOUT', 15.0)),
+    max_connections=int(env.get('CANVAS_MAX_CONNECTIONS', 50)),
+    cache=build_canvas_cache(
+        redis_url=env.get('CANVAS_CACHE_REDIS_URL'),
+        max_age=int(env.get('CANVAS_CACHE_MAX_AGE', 60)),
+        ttl=int(env.get('CANVAS_CACHE_TTL', 3600)),
+        max_entries=int(env.get('CANVAS_CACHE_MAX_ENTRIES', 2048)),
+    ),
+    throttle=CanvasThrottle(
+        max_rate=float(env.get('CANVAS_MAX_RATE', 20)),
+        burst=int(env.get('CANVAS_BURST', 10)),
+        background_reserve=float(env.get('CANVAS_BACKGROUND_RESERVE', 300)),
+        max_retries=int(env.get('CANVAS_MAX_RETRIES', 3)),
+    ),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every request needs Firestore; build it off the loop before serving rather than inside the first handler
+    await run_firestore(firestore_provider.get)
+    pdf_extractor.start()
+    canvas.start()
+    syllabus_jobs.start()
+    if SYNC_ENABLED:
+        sync_scheduler.start()
+    if PRELOAD_CLIENTS:
+        preload = asyncio.get_running_loop().run_in_executor(None, warm_providers)
+    yield
+    await sync_scheduler.stop()
+    await syllabus_jobs.stop()
+    await course_writes.stop()
+    await grade_events.close()
+    await canvas.close()
+    if PRELOAD_CLIENTS:
+        await asyncio.gather(preload, return_exceptions=True)
+    pdf_extractor.shutdown()
+    shutdown_executors()
+    close_providers()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Compress larger responses for mobile clients; brotli needs the optional brotli-asgi package
+COMPRESSION_MIN_SIZE = int(env.get('COMPRESSION_MIN_SIZE', 1024))
+if importlib.util.find_spec("brotli_asgi") is not None:
+    from brotli_asgi import BrotliMiddleware
+    # Falls back to gzip for clients that do not accept br
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MIN_SIZE)
+
+app.add_middleware(MetricsMiddleware, trace_sample_rate=float(env.get('TRACE_SAMPLE_RATE', 0)))
+
+syllabus_cache = SyllabusParseCache(db, env.get('ASSISTANT'))
+pdf_extractor = PdfExtractor(
+    workers=int(env.get('PDF_WORKERS', 2)),
+    max_pages=int(env.get('SYLLABUS_MAX_PAGES', 40)),
+    max_scan_pages=int(env.get('SYLLABUS_MAX_SCAN_PAGES', 400)),
+    trim=env.get('SYLLABUS_TRIM', '1').lower() in ('1', 'true', 'yes'),
+)
+SYNC_ENABLED = env.get('SYNC_ENABLED', '').lower() in ('1', 'true', 'yes')
+SYNC_INTERVAL = int(env.get('SYNC_INTERVAL', 900))
+# On-demand reads use the synced snapshot while it is younger than this
+SYNC_MAX_STALENESS = int(env.get('SYNC_MAX_STALENESS', 2 * SYNC_INTERVAL if SYNC_ENABLED else 0))
+
+sync_limits = {
+    "canvas": TokenBucket(rate=float(env.get('SYNC_CANVAS_RATE', 2)), burst=4),
+    "gradescope": TokenBucket(rate=float(env.get('SYNC_GRADESCOPE_RATE', 0.5)), burst=2),
+}
+sync_scheduler = SyncScheduler(
+    lambda: run_firestore(list_onboarded_users),
+    lambda user_id: sync_user(user_id),
+    interval=SYNC_INTERVAL,
+    jitter=int(env.get('SYNC_JITTER', 60)),
+    concurrency=int(env.get('SYNC_CONCURRENCY', 4)),
+)
+# Real-time grade updates come from Firestore listeners, or this worker's own writes with 'local'
+grade_events = GradeEventHub(
+    db,
+    use_listeners=env.get('GRADE_EVENTS_SOURCE', 'firestore') == 'firestore',
+    queue_size=int(env.get('GRADE_EVENTS_QUEUE_SIZE', 100)),
+)
+GRADE_EVENTS_HEARTBEAT = float(env.get('GRADE_EVENTS_HEARTBEAT', 25))
+# Grade option toggles and recalculations are merged per course document before hitting Firestore
+course_writes = WriteBehindBuffer(
+    db,
+    quiet_period=float(env.get('WRITE_BUFFER_QUIET_PERIOD', 1.0)),
+    max_delay=float(env.get('WRITE_BUFFER_MAX_DELAY', 5.0)),
+    on_merge=lambda ref, data: grade_events.local_change(ref.path, data),
+)
+syllabus_jobs = SyllabusJobQueue(
+    db,
+    lambda job: process_syllabus_job(job),
+    workers=int(env.get('SYLLABUS_WORKERS', 2)),
+    max_queue=int(env.get('SYLLABUS_QUEUE_SIZE', 32)),
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -58,19 +191,23 @@ class SetPredictedGradeRequest(BaseModel):
     class_name: str
     predicted_grade: float
 
+class ComputeGradeRequest(BaseModel):
+    user_id: str
+    class_name: str
+    course_id: str
+
 @app.post("/create_user")
 async def create_user(user: UserCreateRequest):
     try:
         user_ref = db.collection('users').document(user.user_id)
-        user_doc = user_ref.get()
+        user_doc = await run_firestore(user_ref.get, field_paths=["email"])
 
         if user_doc.exists:
             return {"message": "User already exists"}
 
         # Create new user document
-        user_ref.set({
+        await run_firestore(user_ref.set, {
             "email": user.email,
-            "classes": []  # Initialize with empty classes list
         })
 
         return {"message": "User created successfully"}
@@ -81,13 +218,8 @@ async def create_user(user: UserCreateRequest):
 @app.post("/onboard_user")
 async def onboard_user(onboarding: OnboardingRequest):
     try:
-        print(f"Received onboarding majors: {onboarding.majors} (type: {type(onboarding.majors)})")
-        print(f"Received onboarding departments: {onboarding.departments} (type: {type(onboarding.departments)})")
+        logger.debug("Received onboarding majors=%r departments=%r", onboarding.majors, onboarding.departments)
         user_ref = db.collection('users').document(onboarding.user_id)
-        user_doc = user_ref.get()
-
-        if not user_doc.exists:
-            raise HTTPException(status_code=404, detail="User not found")
 
         # Normalize majors and departments to lists of strings
         def normalize_list(val):
@@ -102,24 +234,29 @@ async def onboard_user(onboarding: OnboardingRequest):
         majors = normalize_list(onboarding.majors)
         departments = normalize_list(onboarding.departments)
 
-        print(f"Normalized majors: {majors}")
-        print(f"Normalized departments: {departments}")
-
-        # Update user document with onboarding information
-        user_ref.update({
-            "firstName": onboarding.firstName,
-            "lastName": onboarding.lastName,
-            "majors": majors,
-            "departments": departments,
-            "gpa": onboarding.gpa,
-            "graduationYear": onboarding.graduationYear,
-            "bcourseToken": onboarding.bcourseToken,
-            "profileImage": onboarding.profileImage,
-            "hasOnboarded": True
-        })
+        logger.debug("Normalized majors=%r departments=%r", majors, departments)
+
+        # update() fails on a missing document, so no separate existence read is needed
+        from google.api_core.exceptions import NotFound
+        try:
+            await run_firestore(user_ref.update, {
+                "firstName": onboarding.firstName,
+                "lastName": onboarding.lastName,
+                "majors": majors,
+                "departments": departments,
+                "gpa": onboarding.gpa,
+                "graduationYear": onboarding.graduationYear,
+                "bcourseToken": onboarding.bcourseToken,
+                "profileImage": onboarding.profileImage,
+                "hasOnboarded": True
+            })
+        except NotFound:
+            raise HTTPException(status_code=404, detail="User not found")
 
         return {"message": "User onboarding completed successfully"}
 
+    except HTTPException:
+        raise
     except RequestValidationError as ve:
         return JSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -128,331 +265,365 @@ async def onboard_user(onboarding: OnboardingRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating user: {str(e)}")
 
-@app.post("/syllabus-parse")
+@app.post("/syllabus-parse", status_code=202)
 async def parse_syllabus(
     syllabus: UploadFile = File(...),
     user_id: str = Form(...),
     class_name: str = Form(...)
 ):
-    file_bytes = await syllabus.read()
-    file_like = BytesIO(file_bytes)
-
-    prompt = extract_text_from_pdf(file_like)
-
-    client = OpenAI(
-        api_key=env.get('OPENAI_KEY'),
-        organization=env.get('ORG'),
-        project=env.get('PROJECT'), 
-    )
+    """
+    Queue a syllabus for parsing and return its job ID right away. Poll
+    /syllabus-parse/{job_id} for the result, which is also written to the
+    user's courses subcollection when the job finishes.
+    """
+    file_path, digest = await spool_upload(syllabus)
+    job = SyllabusJob(user_id, class_name, file_path, pdf_key(digest))
 
-    thread = client.beta.threads.create()
+    # Identical uploads (re-uploads, classmates) are answered from the cache
+    cached = await syllabus_cache.get(job.file_key)
+    if cached is not None:
+        remove_spooled(file_path)
+        await upload_user_course(cached, user_id, class_name)
+        await syllabus_jobs.complete(job, cached)
+        return job.to_dict()
 
-    message = client.beta.threads.messages.create(
+    try:
+        await syllabus_jobs.submit(job)
+    except QueueFullError as e:
+        remove_spooled(file_path)
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
+
+@app.get("/syllabus-parse/{job_id}")
+async def get_syllabus_parse_status(job_id: str, wait: float = Query(0.0, ge=0.0, le=30.0)):
+    job = await syllabus_jobs.status(job_id, wait=wait)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Syllabus job not found")
+    return job
+
+async def process_syllabus_job(job: SyllabusJob):
+    try:
+        with job.stage("extracting"):
+            prompt = await pdf_extractor.extract_text(job.file_path)
+            content_key = text_key(prompt)
+    finally:
+        remove_spooled(job.file_path)
+
+    response = await syllabus_cache.get(content_key)
+    if response is None:
+        with job.stage("parsing"):
+            response = await run_syllabus_assistant(prompt)
+
+    with job.stage("saving"):
+        await syllabus_cache.put([job.file_key, content_key], response)
+        await upload_user_course(response, job.user_id, job.class_name)
+    return response
+
+async def run_syllabus_assistant(prompt: str):
+    # The first call imports the SDK, so build the shared client off the event loop
+    client = await run_openai(openai_provider.get)
+
+    with span("openai", "assistant_run"):
+        return await _run_syllabus_thread(client, prompt)
+
+async def _run_syllabus_thread(client, prompt: str):
+    thread = await run_openai(client.beta.threads.create)
+
+    message = await run_openai(
+        client.beta.threads.messages.create,
         thread_id=thread.id,
         role="user",
         content=prompt
     )
 
-    run = client.beta.threads.runs.create_and_poll(
+    run = await run_openai(
+        client.beta.threads.runs.create_and_poll,
         thread_id=thread.id,
         assistant_id=env.get('ASSISTANT'),
     )
 
-    if run.status == 'completed':
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
+    if run.status != 'completed':
+        raise RuntimeError(f"Assistant run ended with status '{run.status}'")
 
+    messages = await run_openai(client.beta.threads.messages.list, thread_id=thread.id)
     last_message = messages.data[0]
-    response = json.loads(remove_newlines(last_message.content[0].text.value))
-
-    # NEW: Upload to user-specific collection
-    upload_user_course(response, user_id, class_name)
-    print(response)
-    return {"message": response}
+    return json.loads(remove_newlines(last_message.content[0].text.value))
 
 def remove_newlines(input_string):
     return input_string.replace("\n", "")
 
-def extract_text_from_pdf(file_like):
-    pdf_reader = PyPDF2.PdfReader(file_like)
-    full_text = ""
-    
-    for page in pdf_reader.pages:
-        text = page.extract_text()
-        if text:
-            full_text += text
-            
-    return full_text
-
 
-def upload_user_course(course: dict, user_id: str, class_name: str):
+async def upload_user_course(course: dict, user_id: str, class_name: str):
     try:
         course_name = course.get("course_name", "Unknown Course").replace(" ", "_")
 
-        db.collection('users').document(user_id).collection('courses').document(class_name).set(course)
+        # Replaces the whole document, so it must not race buffered grade merges for it
+        course_ref = db.collection('users').document(user_id).collection('courses').document(class_name)
+        await course_writes.set(course_ref, course)
 
         return {"message": "Course uploaded successfully", "course_name": course_name}
     except Exception as e:
-        print(e)
+        logger.exception("Failed to upload course", extra={"user_id": user_id, "class_name": class_name})
         raise HTTPException(status_code=500, detail=str(e))
     
 @app.get("/user_course/{user_id}/{class_name}")
 async def get_user_course(user_id: str, class_name: str):
     try:
         doc_ref = db.collection('users').document(user_id).collection('courses').document(class_name)
-        doc = doc_ref.get()
+        doc = await run_firestore(doc_ref.get)
+        course = course_writes.overlay(doc_ref.path, doc.to_dict() if doc.exists else None)
 
-        if not doc.exists:
+        if course is None:
             return {"course_found": False}
 
-        return {"course_found": True, "course_data": doc.to_dict()}
+        return {"course_found": True, "course_data": course}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user course: {str(e)}")
 
     
-CANVAS_API_URL = "https://bcourses.berkeley.edu/api/v1"
-PAT = env.get('PAT')
-
 async def fetch_all_courses():
-    headers = {
-        "Authorization": f"Bearer {PAT}",
-        "Content-Type": "application/json",
-    }
     params = {
         "enrollment_state": "active",
         "state[]": "available",
+        "include[]": "term",
         "per_page": 100
     }
-
-    all_courses = []
     url = f"{CANVAS_API_URL}/courses"
 
-    async with httpx.AsyncClient() as client:
-        while url:
-            response = await client.get(url, headers=headers, params=params)
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail="Failed to fetch courses from Canvas")
-            
-            courses = response.json()
-            all_courses.extend(courses)
-            link = response.headers.get("Link")
-            url = None
-            if link:
-                links = link.split(",")
-                for l in links:
-                    if 'rel="next"' in l:
-                        url = l[l.find("<")+1:l.find(">")]
-                        break 
-
-            params = {}
-    return all_courses
+    async def fetch_page(page_url, page_params):
+        response = await canvas.get(page_url, params=page_params)
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail="Failed to fetch courses from Canvas")
+        return response
 
-@app.get("/get_user_courses")
-async def get_user_courses(user_id: str = Query(...)):
-    try:
-        user_doc_ref = db.collection('users').document(user_id)
-        user_doc = user_doc_ref.get()
+    return await fetch_all_pages(fetch_page, url, params, concurrency=CANVAS_PAGE_CONCURRENCY)
 
-        if user_doc.exists:
-            user_data = user_doc.to_dict()
-            if "classes" in user_data and user_data["classes"]:
-                print(f"Found existing classes for user {user_id}: {user_data['classes']}")
-                return user_data["classes"]
+def user_terms_ref(user_id: str):
+    return db.collection('users').document(user_id).collection('terms')
+
+async def load_user_courses(user_id: str, refresh: bool = False):
+    """
+    Courses for the user's current term, stored per term in
+    users/{uid}/terms/{term_id}. The stored list is reused until it is older
+    than COURSES_REFRESH_INTERVAL or its term has ended; a refresh re-detects
+    the current term and only writes when the course set changed.
+    """
+    user_ref = db.collection('users').document(user_id)
+    user_doc = await run_firestore(user_ref.get, field_paths=["current_term_id"])
+    current_term_id = (user_doc.to_dict() or {}).get("current_term_id") if user_doc.exists else None
+
+    stored = None
+    if current_term_id is not None:
+        term_doc = await run_firestore(user_terms_ref(user_id).document(str(current_term_id)).get)
+        stored = term_doc.to_dict() if term_doc.exists else None
+        if (stored and not refresh
+                and time.time() - stored.get("refreshed_at", 0) < COURSES_REFRESH_INTERVAL
+                and not term_has_ended(stored.get("term"))):
+            return stored["courses"]
+
+    all_courses = await fetch_all_courses()
+    term = detect_current_term(all_courses)
+    if term is None:
+        return []
+    term_courses = [project_course(course) for course in all_courses if course.get("enrollment_term_id") == term["id"]]
+
+    term_ref = user_terms_ref(user_id).document(str(term["id"]))
+    if term["id"] != current_term_id:
+        term_doc = await run_firestore(term_ref.get)
+        stored = term_doc.to_dict() if term_doc.exists else None
+
+    course_ids = sorted(course["id"] for course in term_courses)
+    if stored and stored.get("course_ids") == course_ids:
+        await run_firestore(term_ref.update, {"refreshed_at": time.time()})
+    else:
+        await run_firestore(term_ref.set, {
+            "term": term,
+            "courses": term_courses,
+            "course_ids": course_ids,
+            "refreshed_at": time.time(),
+        })
+        logger.info("Stored term courses", extra={"user_id": user_id, "term_id": term["id"], "count": len(term_courses)})
 
-        all_courses = await fetch_all_courses()
-        spring_2025_courses = [course for course in all_courses if course.get("enrollment_term_id") == 5646]
+    if term["id"] != current_term_id:
+        from firebase_admin import firestore
 
-        user_doc_ref.set({
-            "classes": spring_2025_courses
+        # The legacy classes array is superseded by the terms subcollection
+        await run_firestore(user_ref.set, {
+            "current_term_id": term["id"],
+            "classes": firestore.DELETE_FIELD,
         }, merge=True)
 
-        print(f"Stored {len(spring_2025_courses)} classes for user {user_id}")
-        return spring_2025_courses
+    return term_courses
 
+@app.get("/get_user_courses")
+async def get_user_courses(user_id: str = Query(...), refresh: bool = Query(False)):
+    try:
+        return await load_user_courses(user_id, refresh=refresh)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user courses: {str(e)}")
+
+@app.get("/get_user_courses_with_grades")
+async def get_user_courses_with_grades(user_id: str = Query(...), fields: Optional[str] = Query(None)):
+    """
+    Return the user's courses together with each course's stored syllabus
+    data in one batched Firestore read. `fields` is an optional comma-separated
+    projection (e.g. "predicted_grade") so large syllabus payloads can be skipped.
+    """
+    try:
+        courses = await load_user_courses(user_id)
+
+        courses_ref = db.collection('users').document(user_id).collection('courses')
+        refs = [courses_ref.document(course["course_code"]) for course in courses if course.get("course_code")]
+        field_paths = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+        course_data = {}
+        if refs:
+            def get_all():
+                return list(db.get_all(refs, field_paths=field_paths))
+
+            docs = await run_firestore(get_all)
+            for doc in docs:
+                data = course_writes.overlay(doc.reference.path, doc.to_dict() if doc.exists else None, field_paths)
+                if data is not None:
+                    course_data[doc.id] = data
+
+        return {"courses": courses, "course_data": course_data}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching user courses with grades: {str(e)}")
     
 async def fetch_assignments_with_submissions(course_id: str, user_id: str):
-    headers = {
-        "Authorization": f"Bearer {PAT}",
-        "Content-Type": "application/json",
-    }
     params = {
         "include[]": "submission", 
         "student_ids[]": user_id,
+        # Descriptions and rubrics are most of each assignment's bytes and are never served
+        "exclude_response_fields[]": ["description", "rubric"],
         "per_page": 100
     }
     url = f"{CANVAS_API_URL}/courses/{course_id}/assignments"
 
-    all_assignments = []
-
-    async with httpx.AsyncClient(timeout=15.0) as client:
-        retries = 0
-        max_retries = 3
-        
-        while url:
-            try:
-                response = await client.get(url, headers=headers, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-                if isinstance(data, list):
-                    all_assignments.extend(data)
-                else:
-                    raise ValueError("Unexpected data format, expected a list.")
-
-                # Pagination handling
-                link_header = response.headers.get('link')
-                url = None
-                if link_header:
-                    links = link_header.split(',')
-                    for link in links:
-                        if 'rel="next"' in link:
-                            url = link[link.find('<')+1:link.find('>')]
-                            params = {}  # Clear params when following next URL
-                            break
-                retries = 0  # Reset retries after successful page fetch
-            except (httpx.HTTPError, ValueError) as e:
-                retries += 1
-                if retries > max_retries:
-                    raise HTTPException(status_code=502, detail=f"Failed fetching assignments after retries: {str(e)}")
-                await asyncio.sleep(1.5 * retries)  # Exponential backoff
-
-    return all_assignments
+    async def fetch_page(page_url, page_params):
+        # The Canvas client already retried throttled and failed responses
+        try:
+            response = await canvas.get(page_url, params=page_params)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=502, detail=f"Failed fetching assignments after retries: {str(e)}")
+
+    # Students opening the same course at once share one pagination run
+    return await assignment_flights["canvas"].do(
+        (course_id, user_id, canvas_priority.get()),
+        lambda: fetch_all_pages(fetch_page, url, params, concurrency=CANVAS_PAGE_CONCURRENCY,
+                                transform=project_canvas_assignments),
+    )
 
 GRADESCOPE_EMAIL = os.getenv('GRADESCOPE_EMAIL')
 GRADESCOPE_PASSWORD = os.getenv('GRADESCOPE_PASSWORD')
 
-def normalize_course_name(course_name: str) -> str:
+gradescope_sessions = GradescopeSessionManager(
+    GRADESCOPE_EMAIL,
+    GRADESCOPE_PASSWORD,
+    pool_size=int(env.get('GRADESCOPE_POOL_SIZE', 4)),
+    session_ttl=int(env.get('GRADESCOPE_SESSION_TTL', 1800)),
+    courses_ttl=int(env.get('GRADESCOPE_COURSES_TTL', 600)),
+)
+
+course_matcher = CourseMatcher()
+# Stored Canvas -> Gradescope mappings are re-checked after this many seconds
+COURSE_MATCH_TTL = int(env.get('COURSE_MATCH_TTL', 7 * 24 * 3600))
+# An unmatched course re-scrapes a cached Gradescope course list at most this old
+GRADESCOPE_COURSES_RECHECK_AGE = int(env.get('GRADESCOPE_COURSES_RECHECK_AGE', 60))
+
+assignment_flights = {
+    "canvas": SingleFlight("canvas_assignments"),
+    "gradescope": SingleFlight("gradescope_assignments"),
+}
+
+def find_matching_gradescope_course(canvas_course, gradescope_courses):
     """
-    Normalize course names for comparison by:
-    1. Converting to uppercase
-    2. Removing common prefixes/suffixes
-    3. Removing special characters and extra spaces
+    Find the matching Gradescope course using the indexed matcher.
+    Returns tuple of (course_id, course, confident) if found, else (None, None, False)
     """
-    # Convert to uppercase
-    name = course_name.upper()
-    
-    # Remove common prefixes/suffixes and section identifiers
-    prefixes_to_remove = [
-        "SPRING 2024 ", "FALL 2024 ", "SPRING 2025 ", "FALL 2023 ",
-        "SP24 ", "FA24 ", "SP25 ", "FA23 ",
-        "LEC ", "DIS ", "LAB ", "-LEC", "-DIS", "-LAB",
-        "HWS", "EXAMS", "(SPRING 2025)", "(FALL 2024)", "(SPRING 2024)", "(FALL 2023)"
-    ]
-    for prefix in prefixes_to_remove:
-        name = name.replace(prefix.upper(), "")
-    
-    # Remove special characters and normalize spaces
-    import re
-    name = re.sub(r'[^\w\s]', ' ', name)  # Replace special chars with space
-    name = re.sub(r'\s+', ' ', name)      # Normalize multiple spaces to single space
-    
-    # Remove common course number patterns
-    name = re.sub(r'\b\d{3}\/\d{3}\b', '', name)  # Remove patterns like "215/216"
-    
-    return name.strip()
+    return course_matcher.match(canvas_course, gradescope_courses)
 
-def find_matching_gradescope_course(canvas_course, gradescope_courses):
+def course_match_ref(canvas_course_id: str):
+    return db.collection('course_matches').document(str(canvas_course_id))
+
+async def find_canvas_course(course_id: str):
+    return next((c for c in await fetch_all_courses() if str(c["id"]) == course_id), None)
+
+async def load_gradescope_assignments(course_id: str):
     """
-    Find the matching Gradescope course using multiple matching strategies.
-    Returns tuple of (course_id, course) if found, else (None, None)
+    Fetch and format the Gradescope assignments matching a Canvas course.
+    Upstream errors propagate so callers can report partial failures.
+    Concurrent loads of the same course share one scrape.
     """
-    canvas_name = canvas_course.get("name", "")
-    canvas_code = canvas_course.get("course_code", "")
-    
-    normalized_canvas_name = normalize_course_name(canvas_name)
-    normalized_canvas_code = normalize_course_name(canvas_code)
-    
-    print(f"Canvas course: {canvas_name} ({canvas_code})")
-    print(f"Normalized canvas name: {normalized_canvas_name}")
-    print(f"Normalized canvas code: {normalized_canvas_code}")
-    
-    best_match = (None, None)
-    
-    for course_id, gs_course in gradescope_courses.items():
-        # Try matching against both name and full_name
-        gs_name = gs_course.name
-        gs_full_name = gs_course.full_name
-        
-        normalized_gs_name = normalize_course_name(gs_name)
-        normalized_gs_full_name = normalize_course_name(gs_full_name)
-        
-        print(f"Comparing with Gradescope course: {gs_name} ({gs_full_name})")
-        print(f"Normalized Gradescope name: {normalized_gs_name}")
-        print(f"Normalized Gradescope full name: {normalized_gs_full_name}")
-        
-        # Check for exact matches first
-        if (normalized_canvas_name in normalized_gs_name or 
-            normalized_canvas_name in normalized_gs_full_name or
-            normalized_canvas_code in normalized_gs_name or
-            normalized_canvas_code in normalized_gs_full_name):
-            
-            # Prefer current semester courses
-            if gs_course.semester == "Spring" and gs_course.year == "2025":
-                print(f"Found current semester match: {gs_name}")
-                return course_id, gs_course
-            elif best_match == (None, None):
-                best_match = (course_id, gs_course)
-    
-    return best_match
+    return await assignment_flights["gradescope"].do(course_id, lambda: _load_gradescope_assignments(course_id))
+
+async def _load_gradescope_assignments(course_id: str):
+    # A previously resolved Canvas -> Gradescope mapping skips matching until it expires
+    match_doc = await run_firestore(course_match_ref(course_id).get)
+    stored_match = match_doc.to_dict() if match_doc.exists else {}
+    gs_course_id = stored_match.get("gradescope_course_id")
+    matched_at = stored_match.get("matched_at")
+    if not isinstance(matched_at, (int, float)) or time.time() - matched_at > COURSE_MATCH_TTL:
+        gs_course_id = None
+
+    if gs_course_id is None:
+        # The pooled Gradescope course list and the Canvas course lookup are independent
+        gradescope_courses, canvas_course = await asyncio.gather(
+            run_gradescope(gradescope_sessions.get_courses),
+            find_canvas_course(course_id),
+        )
+        logger.debug("Found %d Gradescope courses", len(gradescope_courses))
 
-async def fetch_gradescope_assignments(course_id: str):
-    try:
-        # Create Gradescope connection
-        connection = GSConnection()
-        connection.login(GRADESCOPE_EMAIL, GRADESCOPE_PASSWORD)
-        
-        # Get all courses
-        courses = connection.account.get_courses()
-        gradescope_courses = courses.get("student", {})
-        print(f"Found {len(gradescope_courses)} Gradescope courses")
-        
-        # Get Canvas course details
-        canvas_course = next((c for c in await fetch_all_courses() if str(c["id"]) == course_id), None)
         if not canvas_course:
-            print(f"Canvas course not found for ID: {course_id}")
+            logger.info("Canvas course not found", extra={"course_id": course_id})
             return []
         
         # Find matching course
-        gs_course_id, matching_course = find_matching_gradescope_course(canvas_course, gradescope_courses)
-        
+        gs_course_id, matching_course, confident = find_matching_gradescope_course(canvas_course, gradescope_courses)
+
+        # The cached list may predate a newly added Gradescope course; rescrape it once
+        if not matching_course and await run_gradescope(gradescope_sessions.invalidate_courses,
+                                                        GRADESCOPE_COURSES_RECHECK_AGE):
+            gradescope_courses = await run_gradescope(gradescope_sessions.get_courses)
+            gs_course_id, matching_course, confident = find_matching_gradescope_course(canvas_course, gradescope_courses)
+
         if not matching_course:
-            print(f"No matching Gradescope course found for: {canvas_course.get('name')}")
+            logger.info("No matching Gradescope course", extra={"course_id": course_id, "canvas_name": canvas_course.get("name")})
+            if match_doc.exists:
+                # The stored mapping no longer holds up; don't serve it to the next student
+                await run_firestore(course_match_ref(course_id).delete)
             return []
-            
-        print(f"Found matching course: {matching_course.name} ({matching_course.full_name})")
-        
-        # Get assignments for the course using the course_id from the dictionary key
-        assignments = connection.account.get_assignments(gs_course_id)
-        
-        # Format assignments to match Canvas format
-        formatted_assignments = []
-        for assignment in assignments:
-            formatted_assignment = {
-                "id": f"gs_{assignment.assignment_id}",
-                "name": assignment.name,
-                "points_possible": assignment.max_grade,
-                "due_at": assignment.due_date.isoformat() if assignment.due_date else None,
-                "source": "gradescope",
-                "status": assignment.submissions_status,
-                "late_due_date": assignment.late_due_date.isoformat() if assignment.late_due_date else None,
-                "release_date": assignment.release_date.isoformat() if assignment.release_date else None
-            }
-            
-            # Add score if available and submitted
-            if hasattr(assignment, 'grade') and assignment.grade is not None:
-                formatted_assignment["score"] = assignment.grade
-            
-            formatted_assignments.append(formatted_assignment)
-            
-        print(f"Found {len(formatted_assignments)} Gradescope assignments")
-        return formatted_assignments
-        
+
+        logger.info("Matched Gradescope course", extra={"course_id": course_id, "gradescope_course_id": gs_course_id,
+                                                        "gradescope_name": matching_course.name, "confident": confident})
+        # The mapping is shared by every student of the course, so only unambiguous matches are stored
+        if confident:
+            await run_firestore(course_match_ref(course_id).set, {
+                "gradescope_course_id": gs_course_id,
+                "canvas_name": canvas_course.get("name"),
+                "gradescope_name": matching_course.name,
+                "matched_at": time.time(),
+            })
+    
+    # Get assignments for the course using the course_id from the dictionary key
+    assignments = await run_gradescope(gradescope_sessions.get_assignments, gs_course_id)
+    
+    # Format assignments to match Canvas format
+    formatted_assignments = [AssignmentRecord.from_gradescope(assignment).to_dict() for assignment in assignments]
+
+    logger.debug("Found %d Gradescope assignments", len(formatted_assignments))
+    return formatted_assignments
+
+async def fetch_gradescope_assignments(course_id: str):
+    try:
+        return await load_gradescope_assignments(course_id)
     except Exception as e:
-        print(f"Error fetching Gradescope assignments: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
+        logger.exception("Error fetching Gradescope assignments", extra={"course_id": course_id})
         return []
 
 @app.get("/get_gradescope_assignments")
@@ -467,37 +638,250 @@ async def get_gradescope_assignments(course_id: str = Query(...)):
 async def get_assignments(course_id: str = Query(...), user_id: str = Query(...)):
     try:
         assignments = await fetch_assignments_with_submissions(course_id, user_id)
+        return {"assignments": format_canvas_assignments(assignments)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching assignments: {str(e)}")
+
+def format_canvas_assignments(records):
+    """Serve projected Canvas `AssignmentRecord`s in the API's assignment shape."""
+    return [record.to_dict() for record in records]
+
+ASSIGNMENT_NAME_NOISE = re.compile(r'[^a-z0-9]+')
+
+def assignment_key(name):
+    return ASSIGNMENT_NAME_NOISE.sub(' ', (name or "").lower()).strip()
+
+def merge_assignments(canvas_assignments, gradescope_assignments):
+    """
+    Merge both sources into one list. An assignment posted on both platforms
+    (same normalized name) is kept once, as the Canvas record, filling in the
+    Gradescope score when Canvas has none.
+    """
+    merged = []
+    by_key = {}
+    for assignment in canvas_assignments:
+        item = dict(assignment, sources=["canvas"])
+        merged.append(item)
+        by_key.setdefault(assignment_key(item["name"]), item)
+
+    for assignment in gradescope_assignments:
+        existing = by_key.get(assignment_key(assignment["name"]))
+        if existing is None or "gradescope" in existing["sources"]:
+            merged.append(dict(assignment, sources=["gradescope"]))
+            continue
+
+        existing["sources"].append("gradescope")
+        existing["gradescope_id"] = assignment["id"]
+        if "score" not in existing and "score" in assignment:
+            existing["score"] = assignment["score"]
+            existing["points_possible"] = assignment["points_possible"]
+
+    return merged
+
+async def timed_source(coro):
+    started = time.perf_counter()
+    try:
+        result = await coro
+        return result, {"ok": True, "count": len(result), "ms": round(1000 * (time.perf_counter() - started), 1)}
+    except Exception as e:
+        logger.warning("Assignment source failed", extra={"error": str(e)})
+        return [], {"ok": False, "error": str(e), "ms": round(1000 * (time.perf_counter() - started), 1)}
+
+@app.get("/get_course_assignments")
+async def get_course_assignments(course_id: str = Query(...), user_id: str = Query(...), refresh: bool = Query(False)):
+    """
+    Canvas and Gradescope assignments for a course in one deduplicated list,
+    fetched concurrently. A failing source is reported under `sources`
+    instead of failing the whole request. A recent snapshot written by the
+    background sync is returned directly unless `refresh` is set.
+    """
+    if SYNC_MAX_STALENESS <= 0:
+        return await collect_course_assignments(course_id, user_id)
+
+    synced = await load_synced_assignments(user_id, course_id)
+    if not refresh and synced and time.time() - synced.get("synced_at", 0) < SYNC_MAX_STALENESS:
+        return {
+            "assignments": synced["assignments"],
+            "sources": synced.get("sources", {}),
+            "partial": False,
+            "synced_at": synced["synced_at"],
+        }
 
-        final_assignments = []
+    collected = await collect_course_assignments(course_id, user_id)
+    await store_synced_assignments(user_id, course_id, collected, synced)
+    return collected
+
+async def collect_course_assignments(course_id: str, user_id: str, limits=None):
+    """`limits` optionally maps "canvas"/"gradescope" to a TokenBucket to wait on first."""
+    async def canvas_source():
+        if limits:
+            await limits["canvas"].acquire()
+        return format_canvas_assignments(await fetch_assignments_with_submissions(course_id, user_id))
+
+    async def gradescope_source():
+        if limits:
+            await limits["gradescope"].acquire()
+        return await load_gradescope_assignments(course_id)
+
+    (canvas_assignments, canvas_info), (gradescope_assignments, gradescope_info) = await asyncio.gather(
+        timed_source(canvas_source()),
+        timed_source(gradescope_source()),
+    )
+
+    return {
+        "assignments": merge_assignments(canvas_assignments, gradescope_assignments),
+        "sources": {"canvas": canvas_info, "gradescope": gradescope_info},
+        "partial": not (canvas_info["ok"] and gradescope_info["ok"]),
+    }
+
+def grade_update(engine):
+    return {
+        "predicted_grade": engine.predicted_grade(),
+        "category_averages": engine.averages,
+        "grade_state": engine.to_state(),
+    }
 
-        for assignment in assignments:
-            base_info = {
-                "id": assignment.get("id"),
-                "name": assignment.get("name"),
-                "points_possible": assignment.get("points_possible"),
-                "due_at": assignment.get("due_at"),
-                "source": "canvas"  # Add source field
-            }
+async def compute_course_grade(user_id: str, class_name: str, assignments, partial=False):
+    """
+    Fold assignments into the stored grade state of one course and persist
+    the result. Only categories with new, changed or removed scores are recomputed,
+    and nothing is written when the grade is unchanged.
+
+    The engine treats `assignments` as the full list, so a `partial` list
+    (a source failed) would retract that source's scores; the stored grade
+    is returned unchanged instead.
+    """
+    course_ref = db.collection('users').document(user_id).collection('courses').document(class_name)
+    course_doc = await run_firestore(course_ref.get)
+    if not course_doc.exists:
+        return None
 
-            # Safely handle missing submission
-            submission = assignment.get("submission")
-            if submission:
-                score = submission.get("score")
-                if score is not None:
-                    base_info["score"] = score
+    course = course_writes.overlay(course_ref.path, course_doc.to_dict())
+    if partial:
+        return {
+            "predicted_grade": course.get("predicted_grade"),
+            "category_averages": course.get("category_averages", {}),
+            "changed_categories": [],
+        }
 
-            final_assignments.append(base_info)
+    engine = GradeEngine(course.get("grade_breakdown"), course.get("grade_style", "raw"), course.get("grade_state"))
+    changed = engine.update(assignments)
+    update = grade_update(engine)
 
-        return {"assignments": final_assignments}
+    if changed or update["predicted_grade"] != course.get("predicted_grade"):
+        course_writes.merge(course_ref, update)
 
+    return {
+        "predicted_grade": update["predicted_grade"],
+        "category_averages": update["category_averages"],
+        "changed_categories": sorted(changed),
+    }
+
+async def recompute_grades_batch(items):
+    """
+    Recompute grades for many (user_id, class_name, assignments) triples with
+    one batched read. Results go through the write buffer, which flushes
+    them in batched writes.
+    """
+    refs = [db.collection('users').document(user_id).collection('courses').document(class_name)
+            for user_id, class_name, _ in items]
+    def get_all():
+        return list(db.get_all(refs))
+
+    docs = await run_firestore(get_all)
+    docs_by_path = {doc.reference.path: doc for doc in docs if doc.exists}
+
+    updated = 0
+    for ref, (_, _, assignments) in zip(refs, items):
+        doc = docs_by_path.get(ref.path)
+        if doc is None:
+            continue
+        course = course_writes.overlay(ref.path, doc.to_dict())
+        engine = GradeEngine(course.get("grade_breakdown"), course.get("grade_style", "raw"), course.get("grade_state"))
+        if engine.update(assignments):
+            course_writes.merge(ref, grade_update(engine))
+            updated += 1
+    return updated
+
+def synced_assignments_ref(user_id: str, course_id: str):
+    return db.collection('users').document(user_id).collection('course_assignments').document(str(course_id))
+
+async def load_synced_assignments(user_id: str, course_id: str):
+    doc = await run_firestore(synced_assignments_ref(user_id, course_id).get)
+    return doc.to_dict() if doc.exists else None
+
+def assignments_hash(assignments):
+    encoded = json.dumps(assignments, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+async def store_synced_assignments(user_id: str, course_id: str, collected, previous=None):
+    """
+    Store a complete assignment snapshot. Returns True when the assignments
+    differ from `previous`; unchanged snapshots only get their timestamp bumped.
+    """
+    if collected["partial"]:
+        return False
+
+    ref = synced_assignments_ref(user_id, course_id)
+    digest = assignments_hash(collected["assignments"])
+    if previous and previous.get("assignments_hash") == digest:
+        await run_firestore(ref.update, {"synced_at": time.time()})
+        return False
+
+    await run_firestore(ref.set, {
+        "assignments": collected["assignments"],
+        "assignments_hash": digest,
+        "sources": collected["sources"],
+        "synced_at": time.time(),
+    })
+    grade_events.local_change(ref.path, {"assignments": collected["assignments"]})
+    return True
+
+def list_onboarded_users():
+    from google.cloud.firestore_v1.base_query import FieldFilter
+
+    query = db.collection('users').where(filter=FieldFilter("hasOnboarded", "==", True)).select(["hasOnboarded"])
+    return [doc.id for doc in query.stream()]
+
+async def sync_user(user_id: str):
+    """Refresh every course snapshot for a user and recompute grades for the ones that changed."""
+    # Runs in its own scheduler task, so this only lowers the priority of this sync's Canvas calls
+    canvas_priority.set(BACKGROUND)
+    changed = []
+    for course in await load_user_courses(user_id):
+        course_id = str(course["id"])
+        collected = await collect_course_assignments(course_id, user_id, limits=sync_limits)
+        previous = await load_synced_assignments(user_id, course_id)
+        if await store_synced_assignments(user_id, course_id, collected, previous) and course.get("course_code"):
+            changed.append((user_id, course["course_code"], collected["assignments"]))
+
+    if changed:
+        await recompute_grades_batch(changed)
+
+@app.post("/compute_predicted_grade")
+async def compute_predicted_grade(data: ComputeGradeRequest):
+    try:
+        collected = await collect_course_assignments(data.course_id, data.user_id)
+        result = await compute_course_grade(data.user_id, data.class_name, collected["assignments"],
+                                            partial=collected["partial"])
+        if result is None:
+            raise HTTPException(status_code=404, detail="Course syllabus not found")
+        return dict(result, partial=collected["partial"])
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching assignments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error computing predicted grade: {str(e)}")
+
+# Profile fields served to the app; the user document also holds tokens and legacy course arrays
+USER_INFO_FIELDS = ["email", "firstName", "lastName", "majors", "departments", "gpa",
+                    "graduationYear", "profileImage", "hasOnboarded"]
 
 @app.get("/check_onboarding/{user_id}")
 async def check_onboarding(user_id: str):
     try:
         user_ref = db.collection('users').document(user_id)
-        user_doc = user_ref.get()
+        user_doc = await run_firestore(user_ref.get, field_paths=USER_INFO_FIELDS)
 
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
@@ -520,10 +904,14 @@ async def check_onboarding(user_id: str):
         raise HTTPException(status_code=500, detail=f"Error checking onboarding status: {str(e)}")
 
 @app.get("/user_info/{user_id}")
-async def get_user_info(user_id: str):
+async def get_user_info(user_id: str, fields: Optional[str] = Query(None)):
+    """`fields` optionally narrows the profile to a comma-separated subset of USER_INFO_FIELDS."""
     try:
+        field_paths = USER_INFO_FIELDS
+        if fields:
+            field_paths = [f.strip() for f in fields.split(",") if f.strip() in USER_INFO_FIELDS]
         user_ref = db.collection('users').document(user_id)
-        user_doc = user_ref.get()
+        user_doc = await run_firestore(user_ref.get, field_paths=field_paths)
         if not user_doc.exists:
             raise HTTPException(status_code=404, detail="User not found")
         return user_doc.to_dict()
@@ -540,7 +928,7 @@ async def update_course_grade_options(options: UpdateGradeOptionsRequest):
         if options.predicted_grade is not None:
             update_data["predicted_grade"] = options.predicted_grade
         course_ref = db.collection('users').document(options.user_id).collection('courses').document(options.class_name)
-        course_ref.set(update_data, merge=True)
+        course_writes.merge(course_ref, update_data)
         return {"message": "Grade options updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating grade options: {str(e)}")
@@ -549,8 +937,89 @@ async def update_course_grade_options(options: UpdateGradeOptionsRequest):
 async def set_predicted_grade(data: SetPredictedGradeRequest):
     try:
         course_ref = db.collection('users').document(data.user_id).collection('courses').document(data.class_name)
-        course_ref.set({"predicted_grade": data.predicted_grade}, merge=True)
+        course_writes.merge(course_ref, {"predicted_grade": data.predicted_grade})
         return {"message": "Predicted grade updated successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating predicted grade: {str(e)}")
 
+
+async def next_grade_event(events):
+    """The next event for a subscriber, a ping after a quiet heartbeat interval, or None at shutdown."""
+    try:
+        return await asyncio.wait_for(events.get(), timeout=GRADE_EVENTS_HEARTBEAT)
+    except asyncio.TimeoutError:
+        return {"type": "ping"}
+
+@app.websocket("/ws/grades/{user_id}")
+async def grade_updates_ws(websocket: WebSocket, user_id: str):
+    """
+    Push assignment, score and predicted-grade changes for the user's
+    courses as JSON messages: {"type": "grade", "class_name", ...changed
+    fields}, {"type": "assignments", "course_id", "changed", "removed"}, or
+    {"type": "resync"} when the client should refetch everything.
+    """
+    await websocket.accept()
+    try:
+        async with grade_events.subscription(user_id) as events:
+            while (event := await next_grade_event(events)) is not None:
+                await websocket.send_json(event)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@app.get("/events/{user_id}")
+async def grade_updates_sse(user_id: str, request: Request):
+    """The same events as /ws/grades/{user_id}, as a server-sent event stream."""
+    async def stream():
+        async with grade_events.subscription(user_id) as events:
+            while not await request.is_disconnected():
+                event = await next_grade_event(events)
+                if event is None:
+                    return
+                if event["type"] == "ping":
+                    yield ": ping\n\n"
+                else:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/executors")
+async def get_executor_stats():
+    return executor_stats()
+
+@app.get("/debug/singleflight")
+async def get_singleflight_stats():
+    groups = [canvas.flights, *assignment_flights.values()]
+    return {group.name: group.stats() for group in groups}
+
+@app.get("/debug/providers")
+async def get_provider_stats():
+    return provider_stats()
+
+@app.get("/debug/syllabus_jobs")
+async def get_syllabus_job_stats():
+    return syllabus_jobs.stats()
+
+@app.get("/debug/sync")
+async def get_sync_stats():
+    return sync_scheduler.stats()
+
+@app.get("/debug/canvas_cache")
+async def get_canvas_cache_stats():
+    return canvas.cache.stats()
+
+@app.get("/debug/grade_events")
+async def get_grade_event_stats():
+    return grade_events.stats()
+
+@app.get("/debug/write_buffer")
+async def get_write_buffer_stats():
+    return course_writes.stats()
+
+@app.get("/debug/canvas_throttle")
+async def get_canvas_throttle_stats():
+    return canvas.throttle.stats()
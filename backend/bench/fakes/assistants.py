@@ -0,0 +1,62 @@
+import itertools
+import json
+import time
+
+from fastapi import FastAPI, Response
+
+SYLLABUS_RESULT = {
+    "course_name": "COMPSCI 100",
+    "grade_breakdown": {"Homework": "30%", "Quiz": "10%", "Midterm 1": "15%", "Midterm 2": "15%", "Final": "30%"},
+}
+
+
+def create_assistants_app(run_seconds=0.5):
+    """
+    OpenAI Assistants stand-in: threads, messages and runs that complete
+    `run_seconds` after creation, answering with a fixed syllabus parse.
+    """
+    app = FastAPI()
+    ids = itertools.count()
+    runs = {}
+
+    def run_object(thread_id, run_id):
+        done = time.monotonic() - runs[run_id] >= run_seconds
+        return {
+            "id": run_id, "object": "thread.run", "created_at": 0, "thread_id": thread_id,
+            "assistant_id": "asst_bench", "status": "completed" if done else "in_progress",
+            "instructions": "", "model": "bench", "tools": [], "parallel_tool_calls": False,
+        }
+
+    @app.post("/v1/threads")
+    async def create_thread():
+        return {"id": f"thread_{next(ids)}", "object": "thread", "created_at": 0, "metadata": {}}
+
+    @app.post("/v1/threads/{thread_id}/messages")
+    async def create_message(thread_id: str):
+        return {
+            "id": f"msg_{next(ids)}", "object": "thread.message", "created_at": 0, "thread_id": thread_id,
+            "role": "user", "status": "completed", "content": [], "attachments": [], "metadata": {},
+        }
+
+    @app.post("/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str):
+        run_id = f"run_{next(ids)}"
+        runs[run_id] = time.monotonic()
+        return run_object(thread_id, run_id)
+
+    @app.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def get_run(thread_id: str, run_id: str, response: Response):
+        # Tell the SDK's create_and_poll helper to poll quickly
+        response.headers["openai-poll-after-ms"] = "50"
+        return run_object(thread_id, run_id)
+
+    @app.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(thread_id: str):
+        message = {
+            "id": f"msg_{next(ids)}", "object": "thread.message", "created_at": 0, "thread_id": thread_id,
+            "role": "assistant", "status": "completed", "attachments": [], "metadata": {},
+            "content": [{"type": "text", "text": {"value": json.dumps(SYLLABUS_RESULT), "annotations": []}}],
+        }
+        return {"object": "list", "data": [message], "first_id": message["id"], "last_id": message["id"], "has_more": False}
+
+    return app
@@ -0,0 +1,93 @@
+import asyncio
+import datetime
+import hashlib
+import json
+
+from fastapi import FastAPI, Request, Response
+
+
+def build_canvas_data(courses=6, past_courses=4, assignments=120):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    current_term = {
+        "id": 9001, "name": "Current Term",
+        "start_at": (now - datetime.timedelta(days=30)).isoformat(),
+        "end_at": (now + datetime.timedelta(days=90)).isoformat(),
+    }
+    past_term = {
+        "id": 9000, "name": "Past Term",
+        "start_at": (now - datetime.timedelta(days=200)).isoformat(),
+        "end_at": (now - datetime.timedelta(days=60)).isoformat(),
+    }
+    course_list = []
+    for i in range(courses + past_courses):
+        term = current_term if i < courses else past_term
+        course_list.append({
+            "id": 1000 + i,
+            "name": f"COMPSCI {100 + i} - Bench Course {i}",
+            "course_code": f"COMPSCI_{100 + i}",
+            "enrollment_term_id": term["id"],
+            "term": term,
+        })
+
+    kinds = ["Homework", "Quiz", "Project", "Midterm 1", "Midterm 2", "Final"]
+    course_assignments = {}
+    for course in course_list:
+        items = []
+        for j in range(assignments):
+            kind = kinds[j % len(kinds)]
+            items.append({
+                "id": course["id"] * 1000 + j,
+                "name": f"{kind} {j // len(kinds) + 1}",
+                "points_possible": 10,
+                "due_at": None,
+                "description": "<p>" + "Lorem ipsum dolor sit amet. " * 40 + "</p>",
+                "submission": {"score": (j * 7) % 11},
+            })
+        course_assignments[course["id"]] = items
+    return course_list, course_assignments
+
+
+def create_canvas_app(course_list, course_assignments, latency=0.05):
+    """Canvas API stand-in with numbered pagination, ETags and fixed latency."""
+    app = FastAPI()
+    app.state.requests = 0
+
+    def paginate(request, items):
+        per_page = int(request.query_params.get("per_page", 10))
+        page = int(request.query_params.get("page", 1))
+        last = max(1, -(-len(items) // per_page))
+        body = json.dumps(items[(page - 1) * per_page:page * per_page]).encode()
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+
+        def page_url(n):
+            return str(request.url.include_query_params(page=n))
+
+        links = [f'<{page_url(1)}>; rel="first"', f'<{page_url(last)}>; rel="last"']
+        if page < last:
+            links.insert(0, f'<{page_url(page + 1)}>; rel="next"')
+        return Response(body, media_type="application/json", headers={
+            "ETag": etag,
+            "Link": ", ".join(links),
+            "X-Rate-Limit-Remaining": "700.0",
+            "X-Request-Cost": "1.0",
+        })
+
+    @app.get("/api/v1/courses")
+    async def courses(request: Request):
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        return paginate(request, course_list)
+
+    @app.get("/api/v1/courses/{course_id}/assignments")
+    async def assignments(course_id: int, request: Request):
+        app.state.requests += 1
+        await asyncio.sleep(latency)
+        items = course_assignments.get(course_id, [])
+        excluded = request.query_params.getlist("exclude_response_fields[]")
+        if excluded:
+            items = [{k: v for k, v in item.items() if k not in excluded} for item in items]
+        return paginate(request, items)
+
+    return app
@@ -0,0 +1,213 @@
+import copy
+import datetime
+import threading
+import time
+import types
+
+from google.api_core.exceptions import NotFound
+from google.cloud.firestore_v1 import transforms
+
+
+def _resolve(value):
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.datetime.now(datetime.timezone.utc)
+    return copy.deepcopy(value)
+
+
+def _merge(target, data):
+    for key, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(value)
+
+
+def _project(data, field_paths):
+    if field_paths is None:
+        return data
+    projected = {}
+    for path in field_paths:
+        source, target = data, projected
+        parts = path.split(".")
+        for part in parts[:-1]:
+            if not isinstance(source.get(part), dict):
+                break
+            source = source[part]
+            target = target.setdefault(part, {})
+        else:
+            if parts[-1] in source:
+                target[parts[-1]] = source[parts[-1]]
+    return projected
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, db, path):
+        self._db = db
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._db, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, **kwargs):
+        self._db.simulate_latency()
+        with self._db.lock:
+            data = self._db.docs.get(self.path)
+            return FakeSnapshot(self, _project(data, field_paths) if data is not None else None)
+
+    def set(self, data, merge=False):
+        self._db.simulate_latency()
+        self._db.write(self.path, data, merge)
+
+    def update(self, data):
+        self._db.simulate_latency()
+        with self._db.lock:
+            if self.path not in self._db.docs:
+                raise NotFound(f"No document to update: {self.path}")
+        self._db.write(self.path, data, merge=True)
+
+    def delete(self):
+        self._db.simulate_latency()
+        with self._db.lock:
+            self._db.docs.pop(self.path, None)
+
+
+class FakeQuery:
+    def __init__(self, db, path, filters=()):
+        self._db = db
+        self._path = path
+        self._filters = filters
+
+    def where(self, filter=None, **kwargs):
+        return FakeQuery(self._db, self._path, self._filters + (filter,))
+
+    def select(self, field_paths):
+        return self
+
+    def stream(self):
+        self._db.simulate_latency()
+        prefix = self._path + "/"
+        with self._db.lock:
+            matches = [(path, copy.deepcopy(data)) for path, data in self._db.docs.items()
+                       if path.startswith(prefix) and "/" not in path[len(prefix):]]
+        for path, data in matches:
+            if all(f.op_string == "==" and data.get(f.field_path) == f.value for f in self._filters):
+                yield FakeSnapshot(FakeDocumentReference(self._db, path), data)
+
+
+class FakeWatch:
+    def __init__(self, db, path, callback):
+        self._db = db
+        self.path = path
+        self.callback = callback
+
+    def notify(self, kind, path, data):
+        change = types.SimpleNamespace(
+            type=types.SimpleNamespace(name=kind),
+            document=FakeSnapshot(FakeDocumentReference(self._db, path), data),
+        )
+        # Firestore delivers snapshots on its own thread
+        threading.Thread(target=self.callback, args=([], [change], None), daemon=True).start()
+
+    def unsubscribe(self):
+        with self._db.lock:
+            if self in self._db.watches:
+                self._db.watches.remove(self)
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, path):
+        super().__init__(db, path)
+
+    def document(self, document_id):
+        return FakeDocumentReference(self._db, f"{self._path}/{document_id}")
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch(self._db, self._path, callback)
+        prefix = self._path + "/"
+        with self._db.lock:
+            current = [(path, copy.deepcopy(data)) for path, data in self._db.docs.items()
+                       if path.startswith(prefix) and "/" not in path[len(prefix):]]
+            self._db.watches.append(watch)
+        changes = [types.SimpleNamespace(type=types.SimpleNamespace(name="ADDED"),
+                                         document=FakeSnapshot(FakeDocumentReference(self._db, path), data))
+                   for path, data in current]
+        threading.Thread(target=callback, args=([], changes, None), daemon=True).start()
+        return watch
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append((reference.path, data, merge))
+
+    def update(self, reference, data):
+        self._writes.append((reference.path, data, True))
+
+    def commit(self):
+        self._db.simulate_latency()
+        for path, data, merge in self._writes:
+            self._db.write(path, data, merge)
+        self._writes = []
+
+
+class FakeFirestore:
+    """
+    In-memory stand-in for the parts of the Firestore client the backend
+    uses. Every round trip sleeps for `latency` seconds to mimic the network.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.docs = {}
+        self.lock = threading.Lock()
+        self.operations = 0
+        self.watches = []
+
+    def simulate_latency(self):
+        self.operations += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def write(self, path, data, merge):
+        with self.lock:
+            kind = "MODIFIED" if path in self.docs else "ADDED"
+            if merge and path in self.docs:
+                _merge(self.docs[path], data)
+            else:
+                fresh = {}
+                _merge(fresh, data)
+                self.docs[path] = fresh
+            watchers = [w for w in self.watches if path.rsplit("/", 1)[0] == w.path]
+            snapshot = copy.deepcopy(self.docs[path])
+        for watch in watchers:
+            watch.notify(kind, path, snapshot)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def get_all(self, references, field_paths=None):
+        self.simulate_latency()
+        with self.lock:
+            found = [(ref, self.docs.get(ref.path)) for ref in references]
+        for ref, data in found:
+            yield FakeSnapshot(ref, _project(data, field_paths) if data is not None else None)
+
+    def batch(self):
+        return FakeBatch(self)
@@ -0,0 +1,64 @@
+import time
+
+
+class FakeCourse:
+    def __init__(self, name, full_name, semester, year):
+        self.name = name
+        self.full_name = full_name
+        self.semester = semester
+        self.year = year
+
+
+class FakeAssignment:
+    def __init__(self, assignment_id, name, grade):
+        self.assignment_id = assignment_id
+        self.name = name
+        self.max_grade = 10.0
+        self.grade = grade
+        self.due_date = None
+        self.late_due_date = None
+        self.release_date = None
+        self.submissions_status = "Graded" if grade is not None else "No Submission"
+
+
+class FakeAccount:
+    def __init__(self, courses, assignments, latency):
+        self._courses = courses
+        self._assignments = assignments
+        self._latency = latency
+
+    def get_courses(self):
+        time.sleep(self._latency)
+        return {"student": self._courses, "instructor": {}}
+
+    def get_assignments(self, course_id):
+        time.sleep(self._latency)
+        return self._assignments.get(course_id, [])
+
+
+def fake_connection_factory(course_list, assignments_per_course=20, latency=0.2, semester=("Fall", "2026")):
+    """
+    Build a GSConnection replacement whose login and scrapes just sleep for
+    `latency` seconds (Gradescope pages are slow HTML renders).
+    """
+    courses = {}
+    assignments = {}
+    for course in course_list:
+        course_id = str(course["id"] + 50000)
+        # Gradescope shows the short code plus the full Canvas title, which the matcher finds by containment
+        code = course["course_code"].replace("_", " ")
+        courses[course_id] = FakeCourse(code, f"{course['name']} {semester[0]} {semester[1]}", *semester)
+        assignments[course_id] = [
+            FakeAssignment(int(course_id) * 100 + j, f"Written Homework {j + 1}", (j * 3) % 11)
+            for j in range(assignments_per_course)
+        ]
+
+    class FakeGSConnection:
+        def __init__(self):
+            self.account = None
+
+        def login(self, email, password):
+            time.sleep(latency)
+            self.account = FakeAccount(courses, assignments, latency)
+
+    return FakeGSConnection
@@ -0,0 +1,259 @@
+"""
+Load-test the backend against local stand-ins for Canvas, Gradescope,
+Firestore and the OpenAI Assistants API.
+
+Run from the backend directory:
+
+    python -m bench.run --users 20 --concurrency 10 --duration 20
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import sys
+import threading
+import time
+import types
+
+import httpx
+import uvicorn
+
+from bench.fakes.assistants import SYLLABUS_RESULT, create_assistants_app
+from bench.fakes.canvas import build_canvas_data, create_canvas_app
+from bench.fakes.firestore import FakeFirestore
+from bench.fakes.gradescope import fake_connection_factory
+
+# Share of simulated screen loads per traffic pattern
+SCENARIO_WEIGHTS = {
+    "home": 40,
+    "course_details": 35,
+    "update_options": 10,
+    "compute_grade": 10,
+    "syllabus_upload": 5,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(asgi_app):
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def build_syllabus_pdf(pages=12):
+    from PyPDF2 import PageObject, PdfWriter
+    from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    })
+    for i in range(pages):
+        text = "Grading: Homework 30%, Final 30%" if i == 1 else f"Course reader page {i} {random.random()}"
+        page = PageObject.create_blank_page(None, 612, 792)
+        stream = DecodedStreamObject()
+        stream.set_data(f"BT /F1 12 Tf 72 712 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = stream
+        page[NameObject("/Resources")] = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        writer.add_page(page)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+GRADED_COURSES = 3
+
+
+def seed_users(db, users, course_list, graded_courses=GRADED_COURSES):
+    for i in range(users):
+        user_id = f"bench_user_{i}"
+        db.write(f"users/{user_id}", {"email": f"{user_id}@berkeley.edu", "hasOnboarded": True,
+                                      "firstName": "Bench", "lastName": str(i)}, merge=False)
+        for course in course_list[:graded_courses]:
+            db.write(f"users/{user_id}/courses/{course['course_code']}", dict(SYLLABUS_RESULT), merge=False)
+    return [f"bench_user_{i}" for i in range(users)]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.gradescope_assignments = 0
+
+    async def call(self, name, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+            ok = response.status_code < 400
+        except Exception:
+            response, ok = None, False
+        self.samples.setdefault(name, []).append(time.perf_counter() - started)
+        if not ok:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+    def report(self, wall_seconds):
+        rows = {}
+        for name, values in sorted(self.samples.items()):
+            values = sorted(values)
+            rows[name] = {
+                "requests": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(values) / wall_seconds, 2),
+                "p50_ms": round(1000 * percentile(values, 50), 1),
+                "p95_ms": round(1000 * percentile(values, 95), 1),
+                "p99_ms": round(1000 * percentile(values, 99), 1),
+            }
+        return rows
+
+
+async def run_scenario(client, recorder, scenario, user_id, course, graded_courses, pdf_bytes):
+    code, course_id = course["course_code"], str(course["id"])
+    if scenario == "home":
+        await recorder.call("GET /get_user_courses_with_grades", client.get(
+            "/get_user_courses_with_grades", params={"user_id": user_id, "fields": "predicted_grade"}))
+    elif scenario == "course_details":
+        _, response = await asyncio.gather(
+            recorder.call("GET /user_course", client.get(f"/user_course/{user_id}/{code}")),
+            recorder.call("GET /get_course_assignments", client.get(
+                "/get_course_assignments", params={"course_id": course_id, "user_id": user_id})),
+        )
+        if response is not None and response.status_code < 400:
+            gradescope = response.json()["sources"].get("gradescope") or {}
+            recorder.gradescope_assignments += gradescope.get("count") or 0
+    elif scenario == "update_options":
+        await recorder.call("POST /update_course_grade_options", client.post("/update_course_grade_options", json={
+            "user_id": user_id, "class_name": code,
+            "grade_style": random.choice(["raw", "curved"]), "grade_platform": "canvas"}))
+    elif scenario == "compute_grade":
+        # Only courses with a stored syllabus have a grade breakdown to compute from
+        if course not in graded_courses:
+            course = random.choice(graded_courses)
+            code, course_id = course["course_code"], str(course["id"])
+        await recorder.call("POST /compute_predicted_grade", client.post("/compute_predicted_grade", json={
+            "user_id": user_id, "class_name": code, "course_id": course_id}))
+    elif scenario == "syllabus_upload":
+        response = await recorder.call("POST /syllabus-parse", client.post(
+            "/syllabus-parse", files={"syllabus": ("syllabus.pdf", pdf_bytes, "application/pdf")},
+            data={"user_id": user_id, "class_name": code}))
+        job = response.json() if response is not None and response.status_code < 400 else None
+        while job and job["status"] not in ("done", "failed"):
+            response = await recorder.call("GET /syllabus-parse/{job_id}", client.get(
+                f"/syllabus-parse/{job['job_id']}", params={"wait": 10}))
+            job = response.json() if response is not None and response.status_code < 400 else None
+
+
+async def drive(app, args, user_ids, course_list):
+    recorder = Recorder()
+    scenarios, weights = zip(*SCENARIO_WEIGHTS.items())
+    current_courses = [c for c in course_list if c["enrollment_term_id"] == course_list[0]["enrollment_term_id"]]
+    # A handful of distinct syllabi, so repeat uploads exercise the parse cache
+    pdfs = [build_syllabus_pdf() for _ in range(3)]
+    deadline = time.monotonic() + args.duration
+
+    async def virtual_user(client):
+        while time.monotonic() < deadline:
+            scenario = random.choices(scenarios, weights)[0]
+            await run_scenario(client, recorder, scenario, random.choice(user_ids),
+                               random.choice(current_courses), current_courses[:GRADED_COURSES],
+                               random.choice(pdfs))
+            await asyncio.sleep(random.uniform(0, args.think_time))
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            started = time.monotonic()
+            await asyncio.gather(*(virtual_user(client) for _ in range(args.concurrency)))
+            report = recorder.report(time.monotonic() - started)
+            report["_upstream"] = {"gradescope_assignments": recorder.gradescope_assignments}
+            return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="simulated student accounts")
+    parser.add_argument("--concurrency", type=int, default=10, help="concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of traffic to generate")
+    parser.add_argument("--think-time", type=float, default=0.1, help="max pause between screen loads")
+    parser.add_argument("--courses", type=int, default=6)
+    parser.add_argument("--assignments", type=int, default=120, help="Canvas assignments per course")
+    parser.add_argument("--canvas-latency", type=float, default=0.05)
+    parser.add_argument("--gradescope-latency", type=float, default=0.2)
+    parser.add_argument("--firestore-latency", type=float, default=0.005)
+    parser.add_argument("--openai-latency", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    course_list, course_assignments = build_canvas_data(courses=args.courses, assignments=args.assignments)
+    canvas_url = serve_in_thread(create_canvas_app(course_list, course_assignments, latency=args.canvas_latency))
+    openai_url = serve_in_thread(create_assistants_app(run_seconds=args.openai_latency))
+
+    os.environ.update({
+        "CANVAS_API_URL": f"{canvas_url}/api/v1",
+        "OPENAI_BASE_URL": f"{openai_url}/v1",
+        "OPENAI_KEY": "bench", "ASSISTANT": "asst_bench", "PAT": "bench",
+        "GRADESCOPE_EMAIL": "bench@berkeley.edu", "GRADESCOPE_PASSWORD": "bench",
+        "LOG_LEVEL": os.environ.get("LOG_LEVEL", "WARNING"),
+    })
+
+    # Swap the Firestore client behind the firebase_config seam before the app imports it
+    db = FakeFirestore(latency=args.firestore_latency)
+    sys.modules["firebase_config"] = types.SimpleNamespace(create_client=lambda: db, close_client=lambda client: None)
+    user_ids = seed_users(db, args.users, course_list)
+
+    import app as backend
+    from course_matcher import current_term
+    from gradescope_session import GradescopeSessionManager
+
+    backend.gradescope_sessions = GradescopeSessionManager(
+        "bench", "bench",
+        connection_factory=fake_connection_factory(course_list, latency=args.gradescope_latency,
+                                                   semester=current_term()),
+    )
+
+    report = asyncio.run(drive(backend.app, args, user_ids, course_list))
+    report["_upstream"]["firestore_operations"] = db.operations
+
+    width = max(len(name) for name in report)
+    print(f"{'endpoint'.ljust(width)}  {'reqs':>6} {'errs':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in report.items():
+        if name.startswith("_"):
+            continue
+        print(f"{name.ljust(width)}  {row['requests']:>6} {row['errors']:>5} {row['rps']:>8} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8}")
+    print(f"firestore operations: {db.operations}")
+    print(f"gradescope assignments served: {report['_upstream']['gradescope_assignments']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    # Without matched Gradescope courses the scrape path was never exercised
+    if "GET /get_course_assignments" in report and not report["_upstream"]["gradescope_assignments"]:
+        sys.exit("No Gradescope assignments were served; the fake courses did not match")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import json
+import time
+from collections import OrderedDict
+
+import httpx
+
+# Only the headers callers actually read are kept with a cached body
+STORED_HEADERS = ("content-type", "link", "etag", "last-modified")
+
+
+class CacheEntry:
+    def __init__(self, content, headers, stored_at=None):
+        self.content = content
+        self.headers = headers
+        self.stored_at = stored_at if stored_at is not None else time.time()
+
+    @classmethod
+    def from_response(cls, response):
+        headers = {name: response.headers[name] for name in STORED_HEADERS if name in response.headers}
+        return cls(response.content, headers)
+
+    def age(self):
+        return time.time() - self.stored_at
+
+    def validators(self):
+        headers = {}
+        if "etag" in self.headers:
+            headers["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+    def to_response(self, request):
+        return httpx.Response(200, headers=self.headers, content=self.content, request=request)
+
+    def dumps(self):
+        return json.dumps({
+            "content": self.content.decode("utf-8"),
+            "headers": self.headers,
+            "stored_at": self.stored_at,
+        })
+
+    @classmethod
+    def loads(cls, raw):
+        data = json.loads(raw)
+        return cls(data["content"].encode("utf-8"), data["headers"], data["stored_at"])
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache; entries older than `ttl` seconds are evicted."""
+
+    def __init__(self, max_entries=2048, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.age() > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """
+    Cache backed by a Redis-compatible server. Entries expire after `ttl`
+    seconds; LRU eviction is left to the server's maxmemory policy.
+    """
+
+    def __init__(self, url, ttl=3600, prefix="canvas:"):
+        import redis.asyncio as redis
+
+        self.ttl = ttl
+        self.prefix = prefix
+        self._redis = redis.from_url(url)
+
+    async def get(self, key):
+        raw = await self._redis.get(self.prefix + key)
+        return CacheEntry.loads(raw) if raw is not None else None
+
+    async def set(self, key, entry):
+        await self._redis.set(self.prefix + key, entry.dumps(), ex=self.ttl)
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class CanvasCache:
+    """
+    Conditional-request cache for Canvas GET responses, keyed by URL and params.
+
+    Entries younger than `max_age` seconds are served without contacting
+    Canvas. Older entries are revalidated with If-None-Match /
+    If-Modified-Since, and a 304 is answered from the stored body.
+    """
+
+    def __init__(self, backend, max_age=60):
+        self.backend = backend
+        self.max_age = max_age
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, params=None):
+        return str(httpx.URL(url, params=params))
+
+    async def get(self, key):
+        return await self.backend.get(key)
+
+    async def set(self, key, entry):
+        await self.backend.set(key, entry)
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self):
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+
+def build_canvas_cache(redis_url=None, max_age=60, ttl=3600, max_entries=2048):
+    if redis_url:
+        backend = RedisCacheBackend(redis_url, ttl=ttl)
+    else:
+        backend = MemoryCacheBackend(max_entries=max_entries, ttl=ttl)
+    return CanvasCache(backend, max_age=max_age)
@@ -0,0 +1,128 @@
+import asyncio
+import importlib.util
+import logging
+
+import httpx
+
+from canvas_cache import CacheEntry
+from canvas_throttle import canvas_priority, canvas_retries_total, retry_reason
+from metrics import span
+from single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class CanvasClient:
+    """
+    App-scoped HTTP client for the Canvas API.
+
+    One pooled `httpx.AsyncClient` is shared by every Canvas call so TLS
+    sessions and keep-alive connections to bCourses are reused across
+    requests and pagination runs. HTTP/2 is used when requested and the
+    `h2` package is installed. GET responses go through `cache` (a
+    `CanvasCache`) when one is given, and identical GETs already in flight
+    share one round trip. With a `throttle` (a `CanvasThrottle`) requests
+    are paced against the token's quota and throttled or failed responses
+    are retried with backoff.
+    """
+
+    def __init__(self, token, http2=False, timeout=15.0, connect_timeout=5.0,
+                 max_connections=50, max_keepalive_connections=20, keepalive_expiry=30.0,
+                 cache=None, throttle=None):
+        self.token = token
+        self.cache = cache
+        self.throttle = throttle
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.flights = SingleFlight("canvas")
+        self._client = None
+
+        if http2 and not self.http2:
+            logger.warning("CANVAS_HTTP2 is set but h2 is not installed, falling back to HTTP/1.1")
+
+    def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Content-Type": "application/json",
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self.cache is not None:
+            await self.cache.close()
+
+    async def get(self, url, params=None, headers=None, use_cache=True):
+        # Priority is part of the key so a user request never waits behind a paced background call
+        key = (str(httpx.URL(url, params=params)), tuple(sorted((headers or {}).items())), use_cache,
+               canvas_priority.get())
+        return await self.flights.do(key, lambda: self._get(url, params, headers, use_cache))
+
+    async def _get(self, url, params, headers, use_cache):
+        # Started lazily so scripts that skip the app lifespan still work
+        client = self._client or self.start()
+        if self.cache is None or not use_cache:
+            return await self._send(client, url, params, headers)
+
+        key = self.cache.key(url, params)
+        entry = await self.cache.get(key)
+        if entry is not None and entry.age() < self.cache.max_age:
+            self.cache.hits += 1
+            return entry.to_response(client.build_request("GET", url, params=params))
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            request_headers.update(entry.validators())
+
+        response = await self._send(client, url, params, request_headers)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated += 1
+            entry = CacheEntry(entry.content, entry.headers)
+            await self.cache.set(key, entry)
+            return entry.to_response(response.request)
+
+        self.cache.misses += 1
+        if response.status_code == 200:
+            await self.cache.set(key, CacheEntry.from_response(response))
+        return response
+
+    async def _send(self, client, url, params, headers):
+        if self.throttle is None:
+            with span("canvas", "get"):
+                return await client.get(url, params=params, headers=headers)
+
+        attempt = 0
+        while True:
+            await self.throttle.acquire()
+            try:
+                with span("canvas", "get"):
+                    response = await client.get(url, params=params, headers=headers)
+            except httpx.TransportError:
+                if attempt >= self.throttle.max_retries:
+                    raise
+                reason, response = "transport_error", None
+            else:
+                self.throttle.observe(response)
+                reason = retry_reason(response)
+                if reason is None or attempt >= self.throttle.max_retries:
+                    return response
+
+            canvas_retries_total.inc(reason)
+            delay = self.throttle.backoff(attempt, response)
+            logger.info("Retrying Canvas request", extra={"url": url, "reason": reason, "delay": round(delay, 2)})
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,82 @@
+import asyncio
+
+import httpx
+
+
+def parse_link_header(header):
+    """Parse a Link header into a {rel: url} dict."""
+    links = {}
+    if not header:
+        return links
+    for part in header.split(","):
+        if "<" not in part or ">" not in part:
+            continue
+        url = part[part.find("<") + 1:part.find(">")]
+        for attr in part[part.find(">") + 1:].split(";"):
+            name, _, value = attr.strip().partition("=")
+            if name == "rel":
+                links[value.strip('"')] = url
+    return links
+
+
+def predict_page_urls(links):
+    """
+    Return the URLs of every remaining page when Canvas uses numeric page
+    numbers and reports `rel="last"`, or None when the next link is opaque
+    (e.g. bookmark-based) and pages must be followed one at a time.
+    """
+    if "next" not in links or "last" not in links:
+        return None
+
+    next_url = httpx.URL(links["next"])
+    last_url = httpx.URL(links["last"])
+    next_page = next_url.params.get("page", "")
+    last_page = last_url.params.get("page", "")
+    if not (next_page.isdigit() and last_page.isdigit()):
+        return None
+    if next_url.copy_remove_param("page") != last_url.copy_remove_param("page"):
+        return None
+
+    return [str(next_url.copy_set_param("page", str(n)))
+            for n in range(int(next_page), int(last_page) + 1)]
+
+
+def _page_items(response, transform=None):
+    data = response.json()
+    if not isinstance(data, list):
+        raise ValueError("Unexpected data format, expected a list.")
+    return transform(data) if transform is not None else data
+
+
+async def fetch_all_pages(fetch_page, url, params=None, concurrency=4, transform=None):
+    """
+    Collect every item of a paginated Canvas list endpoint, in page order.
+
+    `fetch_page(url, params)` must return a successful `httpx.Response`; it
+    is where callers put status checks and retries. After the first page,
+    the remaining pages are fetched concurrently (at most `concurrency` at
+    a time) when their URLs can be predicted, otherwise `rel="next"` is
+    followed sequentially. `transform(items)` is applied to each page as it
+    arrives, so callers can project away fields before every page is in.
+    """
+    response = await fetch_page(url, params)
+    items = _page_items(response, transform)
+    links = parse_link_header(response.headers.get("link"))
+
+    page_urls = predict_page_urls(links)
+    if page_urls is not None:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch_numbered(page_url):
+            async with semaphore:
+                return _page_items(await fetch_page(page_url, None), transform)
+
+        for page in await asyncio.gather(*(fetch_numbered(u) for u in page_urls)):
+            items.extend(page)
+        return items
+
+    while "next" in links:
+        response = await fetch_page(links["next"], None)
+        items.extend(_page_items(response, transform))
+        links = parse_link_header(response.headers.get("link"))
+    return items
@@ -0,0 +1,55 @@
+import datetime
+from collections import Counter
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def detect_current_term(courses, now=None):
+    """
+    Pick the current enrollment term from Canvas courses fetched with
+    `include[]=term`: the term whose dates contain `now`, else the most
+    recently started term, else the most common term id.
+    Returns a dict with id, name, start_at and end_at, or None.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    terms = {}
+    for course in courses:
+        term = course.get("term") or {}
+        term_id = term.get("id", course.get("enrollment_term_id"))
+        if term_id is not None:
+            terms.setdefault(term_id, {
+                "id": term_id,
+                "name": term.get("name"),
+                "start_at": term.get("start_at"),
+                "end_at": term.get("end_at"),
+            })
+    if not terms:
+        return None
+
+    latest = None
+    for term in terms.values():
+        start, end = _parse_time(term["start_at"]), _parse_time(term["end_at"])
+        if start is None or start > now:
+            continue
+        if end is not None and now <= end:
+            return term
+        if latest is None or start > latest[0]:
+            latest = (start, term)
+    if latest is not None:
+        return latest[1]
+
+    counts = Counter(course.get("enrollment_term_id") for course in courses if course.get("enrollment_term_id") is not None)
+    return terms.get(counts.most_common(1)[0][0]) if counts else None
+
+
+def term_has_ended(term, now=None):
+    end = _parse_time((term or {}).get("end_at"))
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    return end is not None and now > end
@@ -0,0 +1,153 @@
+import asyncio
+import contextvars
+import logging
+import random
+import time
+
+from metrics import Counter, Gauge, register
+from rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# Background work (the sync scheduler) sets this so its Canvas calls yield to user requests
+canvas_priority = contextvars.ContextVar("canvas_priority", default=INTERACTIVE)
+
+canvas_retries_total = register(Counter(
+    "canvas_retries_total", "Canvas requests retried after a throttled or failed response.", labels=("reason",)))
+
+
+def retry_reason(response):
+    """Why `response` is worth retrying, or None if it is final."""
+    if response.status_code == 429:
+        return "rate_limited"
+    if response.status_code == 403:
+        # Canvas answers an exhausted quota with a 403 rather than a 429
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        if "Rate Limit Exceeded" in response.text or (remaining is not None and float(remaining) <= 0):
+            return "rate_limited"
+        return None
+    if response.status_code >= 500:
+        return "server_error"
+    return None
+
+
+class CanvasThrottle:
+    """
+    Paces Canvas requests to stay just under the per-token quota.
+
+    Canvas reports the quota left in `X-Rate-Limit-Remaining` and what each
+    request cost in `X-Request-Cost`. Outgoing requests take a token from a
+    `TokenBucket` whose rate adapts to those headers: it is halved when the
+    remaining quota drops below `low_water` and creeps back up while it sits
+    above `high_water`. Between responses the remaining quota is estimated by
+    subtracting the average request cost and adding back `refill_rate` per
+    second of idle time, as Canvas does.
+
+    Background callers (see `canvas_priority`) wait while user-facing
+    requests are queued and while the quota is below `background_reserve`,
+    so a sync cycle never starves an open screen.
+    """
+
+    def __init__(self, max_rate=20.0, min_rate=1.0, burst=10, quota=700.0, refill_rate=10.0,
+                 low_water=200.0, high_water=500.0, background_reserve=300.0,
+                 max_retries=3, backoff_base=0.5, backoff_cap=20.0):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.low_water = low_water
+        self.high_water = high_water
+        self.background_reserve = background_reserve
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.quota = quota
+        self.refill_rate = refill_rate
+
+        self.bucket = TokenBucket(rate=max_rate, burst=burst)
+        self.remaining = quota
+        self._remaining_at = time.monotonic()
+        self.avg_cost = 1.0
+        self.slowdowns = 0
+        self._adjusted_at = 0.0
+        self._waiting_interactive = 0
+        self._interactive_idle = asyncio.Event()
+        self._interactive_idle.set()
+
+        # One throttle per Canvas token, so register its gauges directly
+        register(Gauge("canvas_rate_limit_remaining", "Last known Canvas quota for the token.", (),
+                       lambda: [((), round(self._estimate_remaining(), 1))]))
+        register(Gauge("canvas_request_rate", "Current Canvas request pacing in requests per second.", (),
+                       lambda: [((), round(self.bucket.rate, 2))]))
+
+    async def acquire(self):
+        if canvas_priority.get() == BACKGROUND:
+            await self._wait_for_background_turn()
+            await self.bucket.acquire()
+        else:
+            self._waiting_interactive += 1
+            self._interactive_idle.clear()
+            try:
+                await self.bucket.acquire()
+            finally:
+                self._waiting_interactive -= 1
+                if not self._waiting_interactive:
+                    self._interactive_idle.set()
+        self._set_remaining(self._estimate_remaining() - self.avg_cost)
+
+    def _estimate_remaining(self):
+        idle = time.monotonic() - self._remaining_at
+        return min(self.quota, self.remaining + idle * self.refill_rate)
+
+    def _set_remaining(self, value):
+        self.remaining = value
+        self._remaining_at = time.monotonic()
+
+    async def _wait_for_background_turn(self):
+        while True:
+            await self._interactive_idle.wait()
+            if self._estimate_remaining() >= self.background_reserve:
+                return
+            # Give the quota time to refill before checking again
+            await asyncio.sleep(self.bucket.burst / self.bucket.rate)
+
+    def observe(self, response):
+        cost = response.headers.get("X-Request-Cost")
+        if cost is not None:
+            self.avg_cost = 0.9 * self.avg_cost + 0.1 * float(cost)
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        if remaining is None:
+            return
+        self._set_remaining(float(remaining))
+
+        now = time.monotonic()
+        if self.remaining < self.low_water:
+            # Halve at most once a second; responses already in flight report the same dip
+            if now - self._adjusted_at >= 1.0 and self.bucket.rate > self.min_rate:
+                self.bucket.rate = max(self.min_rate, self.bucket.rate / 2)
+                self._adjusted_at = now
+                self.slowdowns += 1
+                logger.info("Slowing Canvas requests", extra={"remaining": self.remaining, "rate": self.bucket.rate})
+        elif self.remaining > self.high_water and self.bucket.rate < self.max_rate:
+            self.bucket.rate = min(self.max_rate, self.bucket.rate + 0.5)
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry `attempt` (0-based): Retry-After if given, else full jitter."""
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(self.backoff_cap, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    def stats(self):
+        return {
+            "rate": round(self.bucket.rate, 2),
+            "remaining": round(self._estimate_remaining(), 1),
+            "avg_cost": round(self.avg_cost, 2),
+            "slowdowns": self.slowdowns,
+            "waiting_interactive": self._waiting_interactive,
+        }
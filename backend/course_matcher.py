@@ -0,0 +1,145 @@
+import datetime
+import re
+
+# Common prefixes/suffixes and section identifiers, removed before comparing
+PREFIXES_TO_REMOVE = [
+    "SPRING 2024 ", "FALL 2024 ", "SPRING 2025 ", "FALL 2023 ",
+    "SP24 ", "FA24 ", "SP25 ", "FA23 ",
+    "LEC ", "DIS ", "LAB ", "-LEC", "-DIS", "-LAB",
+    "HWS", "EXAMS", "(SPRING 2025)", "(FALL 2024)", "(SPRING 2024)", "(FALL 2023)"
+]
+PREFIX_PATTERN = re.compile("|".join(re.escape(prefix) for prefix in PREFIXES_TO_REMOVE))
+TERM_PATTERN = re.compile(r'\b(SPRING|SUMMER|FALL)\s+20\d{2}\b|\b(SP|SU|FA)\d{2}\b')
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s]')
+SPACES_PATTERN = re.compile(r'\s+')
+COURSE_PAIR_PATTERN = re.compile(r'\b\d{3}\/\d{3}\b')
+
+# Minimum share of the Canvas name's tokens a Gradescope course must contain
+MIN_TOKEN_SCORE = 0.75
+CURRENT_TERM_BONUS = 0.1
+
+
+def normalize_course_name(course_name: str) -> str:
+    """
+    Normalize course names for comparison by:
+    1. Converting to uppercase
+    2. Removing common prefixes/suffixes and term names
+    3. Removing special characters and extra spaces
+    """
+    name = course_name.upper()
+    name = PREFIX_PATTERN.sub("", name)
+    name = TERM_PATTERN.sub("", name)
+    name = COURSE_PAIR_PATTERN.sub("", name)  # Remove patterns like "215/216"
+    name = SPECIAL_CHARS_PATTERN.sub(" ", name)
+    name = SPACES_PATTERN.sub(" ", name)
+    return name.strip()
+
+
+def current_term(today=None):
+    today = today or datetime.date.today()
+    if today.month <= 5:
+        season = "Spring"
+    elif today.month <= 7:
+        season = "Summer"
+    else:
+        season = "Fall"
+    return season, str(today.year)
+
+
+class _IndexedCourse:
+    __slots__ = ("course_id", "course", "names", "tokens")
+
+    def __init__(self, course_id, course):
+        self.course_id = course_id
+        self.course = course
+        self.names = [tuple(n.split()) for n in {normalize_course_name(course.name or ""),
+                                                 normalize_course_name(course.full_name or "")} if n]
+        self.tokens = set()
+        for name in self.names:
+            self.tokens.update(name)
+
+
+def contains_tokens(name, query):
+    """Whether the token sequence `query` appears contiguously in `name`, so "CS 16" is not in "CS 161"."""
+    size = len(query)
+    return any(name[start:start + size] == query for start in range(len(name) - size + 1))
+
+
+class CourseIndex:
+    """
+    Token index over a Gradescope course dict, built once per course list.
+
+    Candidates are the courses sharing a token with the Canvas name or code;
+    each is scored by whole-token containment or token overlap, with a bonus
+    for the current term, and the best one above `MIN_TOKEN_SCORE` wins.
+    Token overlap only counts when the Canvas name carries course numbers
+    ("61A", "C8") and the Gradescope course has all of them, so two
+    "Introduction to ..." courses never match on their shared words.
+
+    A match is confident, and safe to store for every student of the
+    course, only when it came from containment and no other candidate
+    ranks as high.
+    """
+
+    def __init__(self, gradescope_courses):
+        self.courses = [_IndexedCourse(course_id, course) for course_id, course in gradescope_courses.items()]
+        self.by_token = {}
+        for indexed in self.courses:
+            for token in indexed.tokens:
+                self.by_token.setdefault(token, []).append(indexed)
+
+    def _score(self, query, indexed):
+        """(score, contained) of one Canvas query against one Gradescope course."""
+        if any(contains_tokens(name, query) for name in indexed.names):
+            return 1.0, True
+        query_tokens = set(query)
+        numbers = {token for token in query_tokens if any(char.isdigit() for char in token)}
+        if not numbers or not numbers <= indexed.tokens:
+            return 0.0, False
+        return len(query_tokens & indexed.tokens) / len(query_tokens), False
+
+    def match(self, canvas_course, term=None):
+        """(course_id, course, confident) of the best match, or (None, None, False)."""
+        queries = [tuple(q.split()) for q in {normalize_course_name(canvas_course.get("name", "")),
+                                              normalize_course_name(canvas_course.get("course_code", ""))} if q]
+        season, year = term or current_term()
+
+        candidates = {}
+        for query in queries:
+            for token in query:
+                for indexed in self.by_token.get(token, ()):
+                    candidates[id(indexed)] = indexed
+
+        ranked = []
+        for indexed in candidates.values():
+            score, contained = max(self._score(query, indexed) for query in queries)
+            if score < MIN_TOKEN_SCORE:
+                continue
+            rank = score
+            if indexed.course.semester == season and indexed.course.year == year:
+                rank += CURRENT_TERM_BONUS
+            ranked.append((rank, contained, indexed))
+
+        if not ranked:
+            return None, None, False
+        ranked.sort(key=lambda entry: entry[0], reverse=True)
+        rank, contained, best = ranked[0]
+        unique = len(ranked) == 1 or ranked[1][0] < rank
+        return best.course_id, best.course, contained and unique
+
+
+class CourseMatcher:
+    """Keeps the CourseIndex for the most recently seen Gradescope course list."""
+
+    def __init__(self):
+        self._source = None
+        self._index = None
+
+    def index_for(self, gradescope_courses):
+        if gradescope_courses is not self._source:
+            self._index = CourseIndex(gradescope_courses)
+            self._source = gradescope_courses
+        return self._index
+
+    def match(self, canvas_course, gradescope_courses):
+        return self.index_for(gradescope_courses).match(canvas_course)
@@ -0,0 +1,136 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Gauge, register, span
+
+
+class BoundedExecutor:
+    """
+    Thread pool for one blocking backend (Firestore, Gradescope, ...).
+
+    At most `max_workers` calls run at once and at most `max_pending` calls
+    may be running or queued; further callers wait on the event loop without
+    holding a thread. Queue depth and wait times are tracked for `stats()`.
+    """
+
+    def __init__(self, name, max_workers, max_pending):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = asyncio.Semaphore(max_pending)
+        self._lock = threading.Lock()
+
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, fn, *args, **kwargs):
+        operation = getattr(fn, "__name__", "call")
+        with self._lock:
+            self.queued += 1
+        submitted_at = time.monotonic()
+        started = False
+        abandoned = False
+
+        def task():
+            nonlocal started
+            wait = time.monotonic() - submitted_at
+            with self._lock:
+                started = True
+                if not abandoned:
+                    self.queued -= 1
+                self.running += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            try:
+                with span(self.name, operation):
+                    return fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        try:
+            async with self._slots:
+                # Copy the context so spans reach the request's sampled trace
+                context = contextvars.copy_context()
+                return await asyncio.wrap_future(self._pool.submit(context.run, task))
+        finally:
+            # A call cancelled before a worker picked it up leaves the queue here
+            with self._lock:
+                if not started:
+                    abandoned = True
+                    self.queued -= 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(1000 * self.total_wait / self.completed, 2) if self.completed else 0.0,
+                "max_wait_ms": round(1000 * self.max_wait, 2),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _from_env(name, max_workers, max_pending):
+    prefix = name.upper()
+    return BoundedExecutor(
+        name,
+        max_workers=int(os.getenv(f"{prefix}_MAX_WORKERS", max_workers)),
+        max_pending=int(os.getenv(f"{prefix}_MAX_PENDING", max_pending)),
+    )
+
+
+executors = {
+    "firestore": _from_env("firestore", max_workers=16, max_pending=256),
+    "gradescope": _from_env("gradescope", max_workers=4, max_pending=64),
+    "openai": _from_env("openai", max_workers=4, max_pending=32),
+}
+
+
+async def run_firestore(fn, *args, **kwargs):
+    return await executors["firestore"].run(fn, *args, **kwargs)
+
+
+async def run_gradescope(fn, *args, **kwargs):
+    return await executors["gradescope"].run(fn, *args, **kwargs)
+
+
+async def run_openai(fn, *args, **kwargs):
+    return await executors["openai"].run(fn, *args, **kwargs)
+
+
+def _executor_gauge(field):
+    return lambda: [((name,), executor.stats()[field]) for name, executor in executors.items()]
+
+
+register(Gauge("executor_queued", "Blocking calls waiting for a worker thread.", ("executor",), _executor_gauge("queued")))
+register(Gauge("executor_running", "Blocking calls currently running.", ("executor",), _executor_gauge("running")))
+
+
+def executor_stats():
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+def shutdown_executors():
+    for executor in executors.values():
+        executor.shutdown()
@@ -1,9 +1,17 @@
 import firebase_admin
 from firebase_admin import credentials, firestore
 
-# Initialize Firebase only once
-if not firebase_admin._apps:
-    cred = credentials.Certificate("syllo-341ed-firebase-adminsdk-fbsvc-31907d9b0d.json") 
-    firebase_admin.initialize_app(cred)
+CREDENTIALS_PATH = "syllo-341ed-firebase-adminsdk-fbsvc-31907d9b0d.json"
 
-db = firestore.client()
+
+def create_client():
+    """Initialize Firebase if needed and return a Firestore client."""
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(CREDENTIALS_PATH))
+    return firestore.client()
+
+
+def close_client(client):
+    client.close()
+    # The Admin SDK caches the client on its app; deleting the app makes the next create_client build a new one
+    firebase_admin.delete_app(firebase_admin.get_app())
@@ -0,0 +1,123 @@
+# The curved style currently assumes the class median lands at a B
+CURVED_MEDIAN_GRADE = 85.0
+
+
+def parse_weight(weight):
+    """Parse a syllabus weight such as "25%", "25" or 25 into a float."""
+    if weight is None:
+        return None
+    try:
+        return float(str(weight).replace("%", "").strip())
+    except ValueError:
+        return None
+
+
+def categorize_assignment(name, categories):
+    """
+    Map an assignment name to a grade_breakdown category, falling back to
+    common naming conventions when no category name appears in it.
+    """
+    name = name.lower()
+    for category in categories:
+        if category.lower() in name:
+            return category
+    if "quiz" in name:
+        return "quizzes"
+    if "homework" in name or "hw" in name:
+        return "homework"
+    if "midterm" in name:
+        return "midterm_1" if "1" in name else ("midterm_2" if "2" in name else "midterm")
+    if "final" in name:
+        return "final"
+    return None
+
+
+class GradeEngine:
+    """
+    Incremental weighted-grade calculator for one user's course.
+
+    Per-assignment percentages are kept (and persisted via `to_state`) so
+    that `update` only touches the categories whose scores changed; the
+    weighted grade is then rebuilt from the cached category averages.
+    The list passed to `update` is the full truth: stored scores for
+    assignments missing from it or no longer graded are retracted.
+    """
+
+    def __init__(self, grade_breakdown, grade_style="raw", state=None):
+        self.weights = {}
+        for category, weight in (grade_breakdown or {}).items():
+            parsed = parse_weight(weight)
+            if parsed:
+                self.weights[category] = parsed
+        self.categories = list((grade_breakdown or {}).keys())
+        self.grade_style = grade_style
+
+        self.scores = {key: tuple(value) for key, value in ((state or {}).get("scores") or {}).items()}
+        self.totals = {}
+        for category, percent in self.scores.values():
+            total = self.totals.setdefault(category, [0.0, 0])
+            total[0] += percent
+            total[1] += 1
+        self.averages = {category: s / n for category, (s, n) in self.totals.items() if n}
+
+    def update(self, assignments):
+        """Sync scores with the course's current assignments and return the set of changed categories."""
+        current = {}
+        for assignment in assignments:
+            score = assignment.get("score")
+            points = assignment.get("points_possible")
+            if score is None or not points:
+                continue
+            category = categorize_assignment(assignment.get("name") or "", self.categories)
+            if category:
+                current[str(assignment.get("id"))] = (category, score / points * 100)
+
+        changed = set()
+        # Deleted, ungraded or merged-away assignments (a gs_ id folded into its Canvas twin) stop counting
+        for key in [key for key in self.scores if key not in current]:
+            old = self.scores.pop(key)
+            self._adjust(old, -1)
+            changed.add(old[0])
+
+        for key, value in current.items():
+            old = self.scores.get(key)
+            if old == value:
+                continue
+            if old is not None:
+                self._adjust(old, -1)
+                changed.add(old[0])
+            self._adjust(value, 1)
+            self.scores[key] = value
+            changed.add(value[0])
+
+        for category in changed:
+            total, count = self.totals.get(category, (0.0, 0))
+            if count:
+                self.averages[category] = total / count
+            else:
+                self.averages.pop(category, None)
+        return changed
+
+    def _adjust(self, value, sign):
+        category, percent = value
+        total = self.totals.setdefault(category, [0.0, 0])
+        total[0] += sign * percent
+        total[1] += sign
+
+    def predicted_grade(self):
+        weighted_sum = 0.0
+        used_weights = 0.0
+        for category, average in self.averages.items():
+            weight = self.weights.get(category)
+            if not weight:
+                continue
+            weighted_sum += average * weight
+            used_weights += weight
+        if used_weights == 0:
+            return None
+        if self.grade_style == "curved":
+            return CURVED_MEDIAN_GRADE
+        return weighted_sum / used_weights
+
+    def to_state(self):
+        return {"scores": {key: list(value) for key, value in self.scores.items()}}
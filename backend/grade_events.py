@@ -0,0 +1,181 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+from executors import run_firestore
+from metrics import Gauge, register
+
+logger = logging.getLogger(__name__)
+
+# Course document fields whose changes are pushed to clients
+GRADE_FIELDS = ("predicted_grade", "category_averages", "grade_style", "grade_platform")
+
+# users/{uid}/<collection>/{doc} collections that produce events
+WATCHED_COLLECTIONS = ("courses", "course_assignments")
+
+
+def grade_delta(previous, current):
+    return {field: current.get(field) for field in GRADE_FIELDS
+            if field in current and current.get(field) != previous.get(field)}
+
+
+def assignments_delta(previous, current):
+    """(changed assignments, removed assignment ids) between two {id: assignment} maps."""
+    changed = [assignment for key, assignment in current.items() if previous.get(key) != assignment]
+    removed = [key for key in previous if key not in current]
+    return changed, removed
+
+
+class _UserFeed:
+    def __init__(self):
+        self.subscribers = set()
+        self.state = {}
+        self.watches = []
+
+
+class GradeEventHub:
+    """
+    Pushes assignment, score and predicted-grade deltas for a user's
+    courses to every connected client of that user.
+
+    With `use_listeners`, the first subscriber of a user starts one Firestore
+    snapshot listener per watched collection, shared by all of that user's
+    subscribers and stopped with the last one; changes made by any worker
+    (including the background sync) arrive through it. Otherwise this
+    worker's own writes are fed in through `local_change()`.
+
+    Deltas are computed once per document change against the last seen
+    state, so repeated or no-op writes send nothing. A subscriber that
+    falls `queue_size` events behind gets a single "resync" event telling it
+    to refetch instead.
+    """
+
+    def __init__(self, db, use_listeners=True, queue_size=100):
+        self.db = db
+        self.use_listeners = use_listeners
+        self.queue_size = queue_size
+        self._users = {}
+        self._loop = None
+
+        register(Gauge("grade_event_subscribers", "Connected real-time grade update clients.", (),
+                       lambda: [((), sum(len(feed.subscribers) for feed in self._users.values()))]))
+        register(Gauge("grade_event_listeners", "Active Firestore snapshot listeners for grade updates.", (),
+                       lambda: [((), sum(len(feed.watches) for feed in self._users.values()))]))
+
+    @asynccontextmanager
+    async def subscription(self, user_id):
+        """Yield an asyncio.Queue of events for `user_id`; None marks shutdown."""
+        self._loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        feed = self._users.get(user_id)
+        if feed is None:
+            feed = self._users[user_id] = _UserFeed()
+            feed.subscribers.add(queue)
+            if self.use_listeners:
+                await self._start_watches(user_id, feed)
+        else:
+            feed.subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            feed.subscribers.discard(queue)
+            if not feed.subscribers and self._users.get(user_id) is feed:
+                del self._users[user_id]
+                await self._stop_watches(feed)
+
+    async def _start_watches(self, user_id, feed):
+        user_ref = self.db.collection('users').document(user_id)
+        for name in WATCHED_COLLECTIONS:
+            collection = user_ref.collection(name)
+            # The first snapshot is the current state, which clients already fetched over REST
+            primed = asyncio.Event()
+
+            def on_snapshot(docs, changes, read_time, primed=primed):
+                updates = [(change.document.reference.path,
+                            None if change.type.name == "REMOVED" else change.document.to_dict())
+                           for change in changes]
+                self._loop.call_soon_threadsafe(self._apply_snapshot, user_id, updates, primed)
+
+            try:
+                feed.watches.append(await run_firestore(collection.on_snapshot, on_snapshot))
+            except Exception as e:
+                logger.warning("Failed to start grade listener", extra={"user_id": user_id, "error": str(e)})
+
+    async def _stop_watches(self, feed):
+        watches, feed.watches = feed.watches, []
+        for watch in watches:
+            try:
+                await run_firestore(watch.unsubscribe)
+            except Exception as e:
+                logger.warning("Failed to stop grade listener", extra={"error": str(e)})
+
+    def _apply_snapshot(self, user_id, updates, primed):
+        emit = primed.is_set()
+        primed.set()
+        for path, data in updates:
+            self._apply(user_id, path, data, emit=emit)
+
+    def local_change(self, path, data):
+        """Feed a write made by this worker (`data` may be a partial merge)."""
+        if self.use_listeners:
+            return
+        parts = path.split("/")
+        if len(parts) != 4 or parts[0] != "users" or parts[1] not in self._users:
+            return
+        feed = self._users[parts[1]]
+        if parts[2] == "courses":
+            # Merged writes only carry the fields that changed
+            data = dict(feed.state.get(path, {}), **data)
+        self._apply(parts[1], path, data, emit=True)
+
+    def _apply(self, user_id, path, data, emit):
+        feed = self._users.get(user_id)
+        if feed is None:
+            return
+        collection, doc_id = path.split("/")[2:4]
+        previous = feed.state.get(path, {})
+
+        if collection == "courses":
+            current = {field: data[field] for field in GRADE_FIELDS if data and field in data}
+            delta = grade_delta(previous, current)
+            event = dict(delta, type="grade", class_name=doc_id) if delta else None
+        elif collection == "course_assignments":
+            assignments = (data or {}).get("assignments")
+            if assignments is None and data is not None:
+                return
+            current = {str(a.get("id")): a for a in assignments or []}
+            changed, removed = assignments_delta(previous, current)
+            event = ({"type": "assignments", "course_id": doc_id, "changed": changed, "removed": removed}
+                     if changed or removed else None)
+        else:
+            return
+
+        feed.state[path] = current
+        if emit and event is not None:
+            self._publish(feed, event)
+
+    def _publish(self, feed, event):
+        for queue in feed.subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Drop the backlog; the client refetches everything instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    async def close(self):
+        for feed in list(self._users.values()):
+            for queue in feed.subscribers:
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+            await self._stop_watches(feed)
+
+    def stats(self):
+        return {
+            "users": len(self._users),
+            "subscribers": sum(len(feed.subscribers) for feed in self._users.values()),
+            "listeners": sum(len(feed.watches) for feed in self._users.values()),
+            "use_listeners": self.use_listeners,
+        }
@@ -0,0 +1,112 @@
+import logging
+import queue
+import threading
+import time
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class _PooledSession:
+    def __init__(self):
+        self.connection = None
+        self.logged_in_at = 0.0
+
+    def is_fresh(self, max_age):
+        return self.connection is not None and (time.monotonic() - self.logged_in_at) < max_age
+
+
+class GradescopeSessionManager:
+    """
+    Keeps a small pool of logged-in Gradescope sessions alive across requests.
+
+    Sessions are lazily logged in, reused until they reach `session_ttl`
+    seconds old, and logged back in when a call fails or returns what an
+    expired session looks like (an empty course list). The student course
+    list is cached for `courses_ttl` seconds since it rarely changes.
+
+    All methods block on network I/O, so call them from a worker thread.
+    """
+
+    def __init__(self, email, password, pool_size=4, session_ttl=1800, courses_ttl=600,
+                 connection_factory=None):
+        self.email = email
+        self.password = password
+        self.session_ttl = session_ttl
+        self.courses_ttl = courses_ttl
+        self.connection_factory = connection_factory
+
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(_PooledSession())
+
+        self._courses = None
+        self._courses_fetched_at = 0.0
+        self._courses_lock = threading.Lock()
+
+    def _login(self, pooled):
+        if self.connection_factory is None:
+            # gradescopeapi pulls in requests and BeautifulSoup; load it with the first login
+            from gradescopeapi.classes.connection import GSConnection
+            self.connection_factory = GSConnection
+        connection = self.connection_factory()
+        with span("gradescope", "login"):
+            connection.login(self.email, self.password)
+        pooled.connection = connection
+        pooled.logged_in_at = time.monotonic()
+
+    def _call(self, fn, looks_expired=None):
+        """
+        Run `fn(account)` on a pooled session, logging in again and retrying
+        once if the session turns out to be expired.
+        """
+        pooled = self._pool.get()
+        try:
+            if not pooled.is_fresh(self.session_ttl):
+                self._login(pooled)
+            try:
+                result = fn(pooled.connection.account)
+                if looks_expired is None or not looks_expired(result):
+                    return result
+                logger.info("Gradescope session looks expired, logging in again")
+            except Exception as e:
+                logger.warning("Gradescope call failed, logging in again", extra={"error": str(e)})
+
+            self._login(pooled)
+            return fn(pooled.connection.account)
+        except Exception:
+            # Drop the connection so the next caller starts from a clean login
+            pooled.connection = None
+            raise
+        finally:
+            self._pool.put(pooled)
+
+    def get_courses(self):
+        """Return the cached {course_id: Course} dict of student courses."""
+        with self._courses_lock:
+            if self._courses is not None and (time.monotonic() - self._courses_fetched_at) < self.courses_ttl:
+                return self._courses
+
+            courses = self._call(
+                lambda account: account.get_courses(),
+                looks_expired=lambda result: not result.get("student") and not result.get("instructor"),
+            )
+            self._courses = courses.get("student", {})
+            self._courses_fetched_at = time.monotonic()
+            return self._courses
+
+    def get_assignments(self, course_id):
+        return self._call(lambda account: account.get_assignments(course_id))
+
+    def invalidate_courses(self, min_age=0.0):
+        """
+        Drop the cached course list if it was fetched at least `min_age`
+        seconds ago, so the next `get_courses()` scrapes it again. Returns
+        whether it was dropped.
+        """
+        with self._courses_lock:
+            if self._courses is None or time.monotonic() - self._courses_fetched_at < min_age:
+                return False
+            self._courses = None
+            return True
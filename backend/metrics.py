@@ -0,0 +1,190 @@
+import contextvars
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in self._values.items():
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        names = self.labels + ("le",)
+        with self._lock:
+            for label_values, (counts, total, count) in self._series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_label_text(names, label_values + (bound,))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(names, label_values + ('+Inf',))} {count}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, label_values)} {total}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, label_values)} {count}")
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from `callback` at scrape time."""
+
+    def __init__(self, name, help_text, labels, callback):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.callback = callback
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for label_values, value in self.callback():
+            lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+registry = []
+
+
+def register(metric):
+    registry.append(metric)
+    return metric
+
+
+def render_metrics():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_request_seconds = register(Histogram(
+    "http_request_seconds", "HTTP request latency by route.", labels=("method", "route", "status")))
+http_streams_total = register(Counter(
+    "http_streams_total", "Server-sent event streams opened, kept out of http_request_seconds.", labels=("route",)))
+upstream_request_seconds = register(Histogram(
+    "upstream_request_seconds", "Latency of calls to upstream services.", labels=("upstream", "operation")))
+upstream_errors_total = register(Counter(
+    "upstream_errors_total", "Failed calls to upstream services.", labels=("upstream", "operation")))
+
+# Sampled per-request traces: a list of spans, or None when the request isn't sampled
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(upstream, operation):
+    """Time an upstream call into the latency histogram (and the trace, if sampled)."""
+    started = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        upstream_request_seconds.observe(elapsed, upstream, operation)
+        if failed:
+            upstream_errors_total.inc(upstream, operation)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.append({"upstream": upstream, "operation": operation,
+                          "ms": round(1000 * elapsed, 2), "error": failed})
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template, and
+    logging a span breakdown for a `trace_sample_rate` share of requests.
+    Server-sent event streams stay open for minutes to hours, so they are
+    counted in `http_streams_total` rather than timed.
+    """
+
+    def __init__(self, app, trace_sample_rate=0.0):
+        self.app = app
+        self.trace_sample_rate = trace_sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500, "stream": False}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+                status["stream"] = content_type.startswith(b"text/event-stream")
+            await send(message)
+
+        sampled = self.trace_sample_rate and random.random() < self.trace_sample_rate
+        token = _current_trace.set([] if sampled else None)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            if status["stream"]:
+                http_streams_total.inc(route_path)
+            else:
+                http_request_seconds.observe(elapsed, scope["method"], route_path, status["code"])
+            if sampled:
+                logger.info("trace", extra={
+                    "trace_id": uuid.uuid4().hex,
+                    "route": route_path,
+                    "status": status["code"],
+                    "ms": round(1000 * elapsed, 2),
+                    "spans": _current_trace.get(),
+                })
+            _current_trace.reset(token)
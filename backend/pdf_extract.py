@@ -0,0 +1,139 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import span
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Grading and schedule cues; generic words ("week", "due", "%") appear on nearly every page
+RELEVANT_PAGE_PATTERN = re.compile(
+    r'\bgrad(e|es|ed|ing)\b|\bweight(s|ed|ing)?\b|\bmidterms?\b|\bfinal exam\b|\bexams?\b|'
+    r'\bquiz(zes)?\b|\bhomeworks?\b|\bcurv(e|ed|ing)\b|\blate (policy|days?|submissions?|penalty)\b|'
+    r'\bdue dates?\b|\bschedule\b',
+    re.IGNORECASE,
+)
+
+
+async def spool_upload(upload):
+    """
+    Stream an UploadFile to a temp file in chunks instead of holding it in
+    memory. Returns (path, sha256 hexdigest of the bytes).
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(suffix=".pdf", prefix="syllabus_")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            def write(chunk):
+                digest.update(chunk)
+                out.write(chunk)
+
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                # Disk writes and hashing stay off the event loop
+                await asyncio.to_thread(write, chunk)
+    except Exception:
+        os.unlink(path)
+        raise
+    return path, digest.hexdigest()
+
+
+def remove_spooled(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def count_pages(path):
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        return len(PyPDF2.PdfReader(f).pages)
+
+
+def extract_page_range(path, start, stop):
+    """Process-pool worker: text of pages [start, stop) of the PDF at `path`."""
+    import PyPDF2
+
+    with open(path, "rb") as f:
+        reader = PyPDF2.PdfReader(f)
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def warm_worker():
+    """Process-pool worker: import PyPDF2 up front so the first upload doesn't pay for it."""
+    import PyPDF2  # noqa: F401
+
+
+def trim_to_relevant_pages(pages):
+    """
+    Keep the first page (course title, staff) plus every page that talks
+    about grading or the schedule; fall back to all pages if none match.
+    """
+    relevant = [text for i, text in enumerate(pages) if i == 0 or RELEVANT_PAGE_PATTERN.search(text)]
+    return relevant if len(relevant) > 1 else pages
+
+
+class PdfExtractor:
+    """
+    Extracts PDF text on a process pool, `pages_per_task` pages per task,
+    so large course readers neither block the event loop nor serialize on
+    the GIL. Up to `max_scan_pages` pages are read and trimmed to the
+    relevant ones, and at most `max_pages` of those are kept, so a grading
+    section deep in a long reader still reaches the assistant.
+
+    Workers are spawned rather than forked: the API process already runs
+    gRPC and several thread pools, and a forked child can inherit one of
+    their locks (or the logging lock) held and deadlock on it.
+    """
+
+    def __init__(self, workers=2, pages_per_task=8, max_pages=40, max_scan_pages=400, trim=True):
+        self.workers = workers
+        self.pages_per_task = pages_per_task
+        self.max_pages = max_pages
+        self.max_scan_pages = max_scan_pages
+        self.trim = trim
+        self._pool = None
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            # Spawned workers start from a fresh interpreter; boot them now rather than on the first upload
+            for _ in range(self.workers):
+                self._pool.submit(warm_worker)
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def extract_text(self, path):
+        with span("pdf", "extract"):
+            return await self._extract_text(path)
+
+    async def _extract_text(self, path):
+        loop = asyncio.get_running_loop()
+        pool = self._pool or self.start()
+
+        page_count = await loop.run_in_executor(pool, count_pages, path)
+        if self.max_scan_pages:
+            page_count = min(page_count, self.max_scan_pages)
+
+        chunks = await asyncio.gather(*(
+            loop.run_in_executor(pool, extract_page_range, path, start, min(start + self.pages_per_task, page_count))
+            for start in range(0, page_count, self.pages_per_task)
+        ))
+        pages = [text for chunk in chunks for text in chunk]
+        if self.trim:
+            pages = trim_to_relevant_pages(pages)
+        if self.max_pages:
+            pages = pages[:self.max_pages]
+        return "\n".join(text for text in pages if text)
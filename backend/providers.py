@@ -0,0 +1,105 @@
+import os
+import threading
+import time
+
+
+class Provider:
+    """
+    A heavy client (Firestore, OpenAI, ...) built on first use and shared by
+    every caller afterwards.
+
+    The factory does its own imports, so a worker that never touches a client
+    never pays for loading its SDK. `close()` releases the client at
+    shutdown; the next `get()` builds a fresh one, so the app can go
+    through its lifespan more than once in a process (e.g. under tests).
+    """
+
+    def __init__(self, name, factory, close=None):
+        self.name = name
+        self._factory = factory
+        self._close = close
+        self._instance = None
+        self._lock = threading.Lock()
+        self.init_seconds = None
+
+    def get(self):
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    self.init_seconds = time.perf_counter() - started
+                instance = self._instance
+        return instance
+
+    @property
+    def created(self):
+        return self._instance is not None
+
+    def close(self):
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self._close is not None:
+            self._close(instance)
+
+    def stats(self):
+        return {
+            "created": self.created,
+            "init_ms": round(1000 * self.init_seconds, 1) if self.init_seconds is not None else None,
+        }
+
+
+class LazyClient:
+    """Stands in for a provider's client, building it on first attribute access."""
+
+    __slots__ = ("_provider",)
+
+    def __init__(self, provider):
+        self._provider = provider
+
+    def __getattr__(self, name):
+        return getattr(self._provider.get(), name)
+
+
+def _create_firestore():
+    from firebase_config import create_client
+    return create_client()
+
+
+def _close_firestore(db):
+    from firebase_config import close_client
+    close_client(db)
+
+
+def _create_openai():
+    from openai import OpenAI
+    return OpenAI(
+        api_key=os.getenv("OPENAI_KEY"),
+        organization=os.getenv("ORG"),
+        project=os.getenv("PROJECT"),
+    )
+
+
+providers = {
+    "firestore": Provider("firestore", _create_firestore, close=_close_firestore),
+    "openai": Provider("openai", _create_openai, close=lambda client: client.close()),
+}
+
+firestore_provider = providers["firestore"]
+openai_provider = providers["openai"]
+
+
+def warm_providers():
+    """Build every client now, e.g. from a startup thread before traffic arrives."""
+    for provider in providers.values():
+        provider.get()
+
+
+def provider_stats():
+    return {name: provider.stats() for name, provider in providers.items()}
+
+
+def close_providers():
+    for provider in providers.values():
+        provider.close()
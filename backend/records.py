@@ -0,0 +1,80 @@
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+class AssignmentRecord:
+    """
+    A normalized assignment from either source, holding only the fields the
+    app serves. Canvas pages are projected into these as they arrive so the
+    full upstream objects (descriptions, rubrics, HTML) are dropped early.
+    """
+
+    __slots__ = ("id", "name", "points_possible", "due_at", "source", "score",
+                 "status", "late_due_date", "release_date")
+
+    def __init__(self, id, name, points_possible, due_at, source, score=None,
+                 status=None, late_due_date=None, release_date=None):
+        self.id = id
+        self.name = name
+        self.points_possible = points_possible
+        self.due_at = due_at
+        self.source = source
+        self.score = score
+        self.status = status
+        self.late_due_date = late_due_date
+        self.release_date = release_date
+
+    @classmethod
+    def from_canvas(cls, assignment):
+        submission = assignment.get("submission") or {}
+        return cls(
+            assignment.get("id"),
+            assignment.get("name"),
+            assignment.get("points_possible"),
+            assignment.get("due_at"),
+            "canvas",
+            score=submission.get("score"),
+        )
+
+    @classmethod
+    def from_gradescope(cls, assignment):
+        return cls(
+            f"gs_{assignment.assignment_id}",
+            assignment.name,
+            assignment.max_grade,
+            _isoformat(assignment.due_date),
+            "gradescope",
+            score=getattr(assignment, "grade", None),
+            status=assignment.submissions_status,
+            late_due_date=_isoformat(assignment.late_due_date),
+            release_date=_isoformat(assignment.release_date),
+        )
+
+    def to_dict(self):
+        data = {
+            "id": self.id,
+            "name": self.name,
+            "points_possible": self.points_possible,
+            "due_at": self.due_at,
+            "source": self.source,
+        }
+        if self.source == "gradescope":
+            data["status"] = self.status
+            data["late_due_date"] = self.late_due_date
+            data["release_date"] = self.release_date
+        # Only graded assignments carry a score
+        if self.score is not None:
+            data["score"] = self.score
+        return data
+
+
+def project_canvas_assignments(page):
+    return [AssignmentRecord.from_canvas(assignment) for assignment in page]
+
+
+# Course fields the app and frontend read; Canvas course objects carry dozens more
+COURSE_FIELDS = ("id", "name", "course_code", "enrollment_term_id", "term")
+
+
+def project_course(course):
+    return {field: course[field] for field in COURSE_FIELDS if field in course}
@@ -0,0 +1,67 @@
+import asyncio
+from collections import OrderedDict
+
+from metrics import Counter, register
+
+singleflight_calls_total = register(Counter(
+    "singleflight_calls_total", "Deduplicated upstream calls by whether they ran or joined one in flight.",
+    labels=("group", "outcome")))
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent identical upstream calls.
+
+    The first caller for a key starts the call; callers arriving while it is
+    in flight await the same task and get the same result (or exception).
+    The key is forgotten as soon as the call finishes, so this never serves
+    stale data. Results are shared, so callers must not mutate them.
+
+    The call runs as its own task: a leader whose request is cancelled does
+    not cancel the call for the callers still waiting on it. Per-key counts
+    for the `top_keys` busiest keys are kept for `stats()`.
+    """
+
+    def __init__(self, name, top_keys=50):
+        self.name = name
+        self.top_keys = top_keys
+        self._inflight = {}
+        self._key_counts = OrderedDict()
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            singleflight_calls_total.inc(self.name, "leader")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.coalesced += 1
+            singleflight_calls_total.inc(self.name, "coalesced")
+            self._count(key)
+        return await asyncio.shield(task)
+
+    def _finish(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller gave up waiting
+            task.exception()
+
+    def _count(self, key):
+        self._key_counts[key] = self._key_counts.get(key, 0) + 1
+        self._key_counts.move_to_end(key)
+        while len(self._key_counts) > self.top_keys:
+            # Drop the least recently coalesced key
+            self._key_counts.popitem(last=False)
+
+    def stats(self):
+        busiest = sorted(self._key_counts.items(), key=lambda item: item[1], reverse=True)[:10]
+        return {
+            "inflight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "top_coalesced_keys": [{"key": str(key), "coalesced": count} for key, count in busiest],
+        }
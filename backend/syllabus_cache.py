@@ -0,0 +1,78 @@
+import hashlib
+import re
+
+from cachetools import LRUCache
+
+from executors import run_firestore
+
+# Bump when the stored result format changes to invalidate every entry
+SYLLABUS_CACHE_VERSION = 1
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def pdf_key(sha256_hexdigest):
+    return "pdf_" + sha256_hexdigest
+
+
+def text_key(text):
+    """Key on extracted text so re-exported copies of the same PDF still hit."""
+    normalized = WHITESPACE_PATTERN.sub(" ", text).strip().lower()
+    return "text_" + hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class SyllabusParseCache:
+    """
+    Parsed-syllabus results keyed by content hash, stored in Firestore with
+    a small in-process LRU in front. An entry only counts as a hit when it
+    was produced by the current assistant and cache version, so switching
+    the assistant invalidates every older parse.
+    """
+
+    def __init__(self, db, assistant_id, collection="syllabus_parses", local_entries=256):
+        self.db = db
+        self.collection_name = collection
+        self.assistant_id = assistant_id
+        self._local = LRUCache(maxsize=local_entries)
+
+    @property
+    def collection(self):
+        # Looked up on use: the cache is constructed at import, before the client exists
+        return self.db.collection(self.collection_name)
+
+    def _is_current(self, entry):
+        return (entry.get("assistant_id") == self.assistant_id
+                and entry.get("version") == SYLLABUS_CACHE_VERSION)
+
+    async def get(self, key):
+        result = self._local.get(key)
+        if result is not None:
+            return result
+
+        doc = await run_firestore(self.collection.document(key).get)
+        if not doc.exists:
+            return None
+        entry = doc.to_dict()
+        if not self._is_current(entry):
+            return None
+
+        self._local[key] = entry["result"]
+        return entry["result"]
+
+    async def put(self, keys, result):
+        from firebase_admin import firestore
+
+        def write():
+            batch = self.db.batch()
+            for key in keys:
+                batch.set(self.collection.document(key), {
+                    "result": result,
+                    "assistant_id": self.assistant_id,
+                    "version": SYLLABUS_CACHE_VERSION,
+                    "created_at": firestore.SERVER_TIMESTAMP,
+                })
+            batch.commit()
+
+        await run_firestore(write)
+        for key in keys:
+            self._local[key] = result
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from executors import run_firestore
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATES = ("done", "failed")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class SyllabusJob:
+    def __init__(self, user_id, class_name, file_path, file_key):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.class_name = class_name
+        self.file_path = file_path
+        self.file_key = file_key
+        self.status = "queued"
+        self.error = None
+        self.result = None
+        self.timings = {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self.finished = asyncio.Event()
+
+    @contextmanager
+    def stage(self, name):
+        """Mark the job as being in `name` and record how long the stage took."""
+        self.status = name
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(1000 * (time.perf_counter() - started), 1)
+
+    def finish(self, result=None, error=None):
+        self.status = "failed" if error else "done"
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self.finished.set()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "timings_ms": self.timings,
+        }
+
+
+class SyllabusJobQueue:
+    """
+    Bounded queue of syllabus-parse jobs drained by `workers` background tasks.
+
+    `process(job)` does the actual work and returns the parsed result. Job
+    state lives in memory for fast polling and is mirrored to the
+    `syllabus_jobs` collection so any API worker can answer a status check;
+    jobs held by another worker are polled there every `poll_interval`
+    seconds. Jobs left unfinished at `stop()` are marked failed.
+    """
+
+    def __init__(self, db, process, workers=2, max_queue=32, keep_finished=500, poll_interval=1.0):
+        self.db = db
+        self.process = process
+        self.workers = workers
+        self.max_queue = max_queue
+        self.keep_finished = keep_finished
+        self.poll_interval = poll_interval
+
+        self._queue = None
+        self._tasks = []
+        self._jobs = OrderedDict()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self._stage_totals = {}
+
+    def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+        # Queued and interrupted jobs would otherwise read "queued" in Firestore forever
+        unfinished = [job for job in self._jobs.values() if job.status not in FINISHED_STATES]
+        for job in unfinished:
+            job.finish(error="The server shut down before the syllabus was parsed, please upload it again")
+            self.failed += 1
+        await asyncio.gather(*(self._save(job) for job in unfinished))
+
+    @property
+    def collection(self):
+        return self.db.collection("syllabus_jobs")
+
+    async def _save(self, job):
+        from firebase_admin import firestore
+
+        data = job.to_dict()
+        data["user_id"] = job.user_id
+        data["class_name"] = job.class_name
+        data["updated_at"] = firestore.SERVER_TIMESTAMP
+        try:
+            await run_firestore(self.collection.document(job.id).set, data)
+        except Exception as e:
+            logger.warning("Failed to save syllabus job", extra={"job_id": job.id, "error": str(e)})
+
+    def _remember(self, job):
+        self._jobs[job.id] = job
+        # Forget the oldest finished jobs; Firestore still has their status
+        while len(self._jobs) > self.keep_finished:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status not in FINISHED_STATES:
+                break
+            del self._jobs[oldest_id]
+
+    async def submit(self, job):
+        if self._queue is None:
+            raise RuntimeError("Syllabus job queue is not running")
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError("Too many syllabus uploads in progress, try again shortly")
+        self._remember(job)
+        await self._save(job)
+        return job
+
+    async def complete(self, job, result):
+        """Record a job that finished without queueing (e.g. a cache hit)."""
+        job.finish(result=result)
+        self._remember(job)
+        self.completed += 1
+        await self._save(job)
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            self.running += 1
+            try:
+                result = await self.process(job)
+                job.finish(result=result)
+                self.completed += 1
+            except Exception as e:
+                logger.exception("Syllabus job failed", extra={"job_id": job.id})
+                job.finish(error=str(e))
+                self.failed += 1
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+            for stage, ms in job.timings.items():
+                total = self._stage_totals.setdefault(stage, [0.0, 0])
+                total[0] += ms
+                total[1] += 1
+            await self._save(job)
+
+    async def status(self, job_id, wait=0.0):
+        """Current job state; with `wait`, block up to that many seconds for it to finish."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return await self._stored_status(job_id, wait)
+
+        if wait > 0 and not job.finished.is_set():
+            try:
+                await asyncio.wait_for(job.finished.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        return job.to_dict()
+
+    async def _stored_status(self, job_id, wait):
+        """Status of a job this worker does not hold, re-read from Firestore for up to `wait` seconds."""
+        deadline = time.monotonic() + wait
+        while True:
+            doc = await run_firestore(self.collection.document(job_id).get)
+            data = doc.to_dict() if doc.exists else None
+            remaining = deadline - time.monotonic()
+            if data is None or data.get("status") in FINISHED_STATES or remaining <= 0:
+                return data
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_stage_ms": {stage: round(total / count, 1) for stage, (total, count) in self._stage_totals.items()},
+        }
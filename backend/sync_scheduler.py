@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SyncScheduler:
+    """
+    Periodically runs `sync_user(user_id)` for every id yielded by
+    `list_users()`, from a background task started in the app lifespan.
+
+    Each cycle shuffles the users and starts each sync after a random delay
+    of up to `jitter` seconds, with at most `concurrency` syncs in flight,
+    so upstream load is spread out instead of arriving in bursts.
+    """
+
+    def __init__(self, list_users, sync_user, interval=900, jitter=60, concurrency=4):
+        self.list_users = list_users
+        self.sync_user = sync_user
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self._task = None
+
+        self.cycles = 0
+        self.synced = 0
+        self.failed = 0
+        self.last_cycle_seconds = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.run_cycle()
+            except Exception:
+                logger.exception("Sync cycle failed")
+            self.last_cycle_seconds = round(time.monotonic() - started, 1)
+            await asyncio.sleep(max(0.0, self.interval + random.uniform(-self.jitter, self.jitter)))
+
+    async def run_cycle(self):
+        user_ids = list(await self.list_users())
+        random.shuffle(user_ids)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def sync_one(user_id):
+            await asyncio.sleep(random.uniform(0, self.jitter))
+            async with semaphore:
+                try:
+                    await self.sync_user(user_id)
+                    self.synced += 1
+                except Exception as e:
+                    logger.warning("Sync failed for user", extra={"user_id": user_id, "error": str(e)})
+                    self.failed += 1
+
+        await asyncio.gather(*(sync_one(user_id) for user_id in user_ids))
+        self.cycles += 1
+
+    def stats(self):
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "cycles": self.cycles,
+            "synced": self.synced,
+            "failed": self.failed,
+            "last_cycle_seconds": self.last_cycle_seconds,
+        }
@@ -0,0 +1,48 @@
+import asyncio
+
+import app
+from bench.fakes.firestore import FakeFirestore
+from write_buffer import WriteBehindBuffer
+
+COURSE_PATH = "users/u1/courses/CS_61A"
+
+
+def seed(monkeypatch):
+    db = FakeFirestore()
+    monkeypatch.setattr(app, "db", db)
+    monkeypatch.setattr(app, "course_writes", WriteBehindBuffer(db))
+    db.collection("users").document("u1").collection("courses").document("CS_61A").set({
+        "grade_breakdown": {"homework": "100%"},
+        "grade_state": {"scores": {"gs_1": ["homework", 90.0], "2": ["homework", 70.0]}},
+        "category_averages": {"homework": 80.0},
+        "predicted_grade": 80.0,
+    })
+    return db
+
+
+CANVAS_ONLY = [{"id": 2, "name": "Homework 2", "score": 7, "points_possible": 10}]
+
+
+def test_partial_assignments_keep_the_stored_grade(monkeypatch):
+    seed(monkeypatch)
+
+    result = asyncio.run(app.compute_course_grade("u1", "CS_61A", CANVAS_ONLY, partial=True))
+
+    assert result["predicted_grade"] == 80.0
+    assert result["changed_categories"] == []
+    assert app.course_writes.stats()["pending"] == 0
+
+
+def test_complete_assignments_retract_and_persist(monkeypatch):
+    seed(monkeypatch)
+
+    async def compute():
+        result = await app.compute_course_grade("u1", "CS_61A", CANVAS_ONLY)
+        buffered = app.course_writes.overlay(COURSE_PATH, None)
+        await app.course_writes.stop()
+        return result, buffered
+
+    result, buffered = asyncio.run(compute())
+
+    assert result["predicted_grade"] == 70.0
+    assert buffered["grade_state"] == {"scores": {"2": ["homework", 70.0]}}
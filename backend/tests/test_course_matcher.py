@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+from course_matcher import CourseIndex
+
+TERM = ("Fall", "2026")
+
+
+def course(name, full_name="", semester="Fall", year="2026"):
+    return SimpleNamespace(name=name, full_name=full_name, semester=semester, year=year)
+
+
+def match(canvas_name, canvas_code, gradescope_courses):
+    return CourseIndex(gradescope_courses).match({"name": canvas_name, "course_code": canvas_code}, term=TERM)
+
+
+def test_course_code_prefix_does_not_match_longer_code():
+    assert match("CS 16", "CS 16", {"1": course("CS 161 Security")}) == (None, None, False)
+    assert match("CS 6", "CS 6", {"1": course("CS 61A")}) == (None, None, False)
+
+
+def test_code_without_letter_suffix_does_not_pick_a_variant():
+    courses = {"1": course("CS 61A"), "2": course("CS 61B")}
+
+    assert match("CS 61", "CS 61", courses) == (None, None, False)
+
+
+def test_whole_token_containment_is_confident():
+    courses = {"1": course("CS 61A", "CS 61A Structure and Interpretation"), "2": course("CS 61B")}
+
+    course_id, _, confident = match("CS 61A", "CS 61A", courses)
+
+    assert (course_id, confident) == ("1", True)
+
+
+def test_shared_generic_words_do_not_match():
+    courses = {"1": course("CS 61A", "Introduction to Computer Science")}
+
+    assert match("Introduction to Data Science", "DATA C8", courses) == (None, None, False)
+
+
+def test_tied_candidates_are_not_confident():
+    courses = {"1": course("DATA C8", "DATA C8 Lecture"), "2": course("DATA C8", "DATA C8 Discussion")}
+
+    course_id, _, confident = match("DATA C8", "DATA C8", courses)
+
+    assert course_id in courses
+    assert not confident
+
+
+def test_current_term_breaks_tie():
+    courses = {"1": course("DATA C8", semester="Spring", year="2026"), "2": course("DATA C8")}
+
+    course_id, _, confident = match("DATA C8", "DATA C8", courses)
+
+    assert (course_id, confident) == ("2", True)
+
+
+def test_token_overlap_match_is_not_confident():
+    courses = {"1": course("DATA C8", "Foundations of Data Science C8")}
+
+    course_id, _, confident = match("DATA C8 Foundations", "", courses)
+
+    assert (course_id, confident) == ("1", False)
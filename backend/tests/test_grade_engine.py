@@ -0,0 +1,54 @@
+from grade_engine import GradeEngine
+
+BREAKDOWN = {"homework": "40%", "midterm": "60%"}
+
+
+def test_ungraded_assignment_is_retracted():
+    engine = GradeEngine(BREAKDOWN, state={"scores": {"1": ["homework", 0.0]}})
+    assert engine.predicted_grade() == 0.0
+
+    changed = engine.update([{"id": 1, "name": "Homework 1", "points_possible": 10}])
+
+    assert changed == {"homework"}
+    assert engine.predicted_grade() is None
+    assert engine.to_state()["scores"] == {}
+
+
+def test_missing_assignment_is_retracted():
+    engine = GradeEngine(BREAKDOWN)
+    engine.update([
+        {"id": 1, "name": "Homework 1", "score": 5, "points_possible": 10},
+        {"id": 2, "name": "Midterm", "score": 90, "points_possible": 100},
+    ])
+
+    changed = engine.update([{"id": 2, "name": "Midterm", "score": 90, "points_possible": 100}])
+
+    assert changed == {"homework"}
+    assert "homework" not in engine.averages
+    assert engine.predicted_grade() == 90.0
+
+
+def test_gradescope_score_hands_off_to_merged_canvas_assignment():
+    engine = GradeEngine(BREAKDOWN)
+    engine.update([{"id": "gs_1", "name": "Homework 1", "score": 8, "points_possible": 10}])
+
+    # Canvas later posts the same assignment and merge_assignments folds gs_1 into it
+    changed = engine.update([
+        {"id": 99, "name": "Homework 1", "score": 8, "points_possible": 10, "gradescope_id": "gs_1"},
+    ])
+
+    assert changed == {"homework"}
+    assert list(engine.to_state()["scores"]) == ["99"]
+    assert engine.totals["homework"][1] == 1
+    assert engine.predicted_grade() == 80.0
+
+
+def test_unchanged_assignments_report_no_changes():
+    assignments = [{"id": 1, "name": "Homework 1", "score": 5, "points_possible": 10}]
+    engine = GradeEngine(BREAKDOWN)
+    engine.update(assignments)
+
+    restored = GradeEngine(BREAKDOWN, state=engine.to_state())
+
+    assert restored.update(assignments) == set()
+    assert restored.predicted_grade() == 50.0
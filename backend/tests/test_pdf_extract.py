@@ -0,0 +1,21 @@
+from pdf_extract import RELEVANT_PAGE_PATTERN, trim_to_relevant_pages
+
+
+def test_generic_reader_pages_are_not_relevant():
+    for text in ("Graduate student instructors hold office hours",
+                 "Week 3: recursion, reading due Friday",
+                 "Lecture 5: 100% of the examples use Python"):
+        assert not RELEVANT_PAGE_PATTERN.search(text), text
+
+
+def test_grading_pages_are_relevant():
+    for text in ("Grading: homework 30%, midterm 30%, final exam 40%",
+                 "Late policy: two slip days",
+                 "The course is curved to a B+"):
+        assert RELEVANT_PAGE_PATTERN.search(text), text
+
+
+def test_trim_keeps_title_and_grading_pages_from_anywhere():
+    pages = ["CS 61A Syllabus"] + [f"Lecture {i} notes" for i in range(60)] + ["Grading: homework 50%"]
+
+    assert trim_to_relevant_pages(pages) == ["CS 61A Syllabus", "Grading: homework 50%"]
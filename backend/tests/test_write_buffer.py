@@ -0,0 +1,112 @@
+import asyncio
+
+from bench.fakes.firestore import FakeFirestore
+from write_buffer import WriteBehindBuffer
+
+PATH = "users/u1/courses/CS_61A"
+
+
+def course_ref(db):
+    return db.collection("users").document("u1").collection("courses").document("CS_61A")
+
+
+def test_merges_to_one_document_coalesce_into_one_write():
+    db = FakeFirestore()
+
+    async def run():
+        buffer = WriteBehindBuffer(db, quiet_period=0.05)
+        buffer.merge(course_ref(db), {"predicted_grade": 80.0, "grade_style": "raw"})
+        buffer.merge(course_ref(db), {"predicted_grade": 85.0})
+        assert buffer.overlay(PATH, {"grade_breakdown": {}}) == {
+            "grade_breakdown": {}, "predicted_grade": 85.0, "grade_style": "raw"}
+        await asyncio.sleep(0.2)
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+
+    assert db.docs[PATH] == {"predicted_grade": 85.0, "grade_style": "raw"}
+    assert buffer.stats()["flushes"] == 1
+    assert db.operations == 1
+
+
+def test_failed_flush_is_retried_with_newer_fields_winning():
+    db = FakeFirestore()
+    batch = db.batch
+    calls = []
+
+    def failing_once():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("unavailable")
+        return batch()
+
+    db.batch = failing_once
+
+    async def run():
+        buffer = WriteBehindBuffer(db, quiet_period=0.0, retry_delay=0.05)
+        buffer.merge(course_ref(db), {"predicted_grade": 80.0, "grade_style": "raw"})
+        await asyncio.sleep(0.01)
+        buffer.merge(course_ref(db), {"predicted_grade": 90.0})
+        await asyncio.sleep(0.2)
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+
+    assert db.docs[PATH] == {"predicted_grade": 90.0, "grade_style": "raw"}
+    assert buffer.stats()["failed_flushes"] == 1
+
+
+def test_set_replaces_the_document_and_drops_earlier_merges():
+    db = FakeFirestore()
+    course_ref(db).set({"grade_breakdown": {"homework": "100%"}, "predicted_grade": 70.0})
+
+    async def run():
+        buffer = WriteBehindBuffer(db, quiet_period=10)
+        buffer.merge(course_ref(db), {"predicted_grade": 75.0})
+        await buffer.set(course_ref(db), {"grade_breakdown": {"exams": "100%"}})
+        await buffer.stop()
+        return buffer
+
+    buffer = asyncio.run(run())
+
+    assert db.docs[PATH] == {"grade_breakdown": {"exams": "100%"}}
+    assert buffer.overlay(PATH, None) is None
+
+
+def test_set_is_visible_while_in_flight_and_later_merges_land_after_it():
+    db = FakeFirestore(latency=0.1)
+
+    async def run():
+        buffer = WriteBehindBuffer(db, quiet_period=0.0)
+        replace = asyncio.create_task(buffer.set(course_ref(db), {"grade_breakdown": {"exams": "100%"}}))
+        await asyncio.sleep(0.02)
+        # Firestore still has nothing, but this worker must read its own replace
+        assert buffer.overlay(PATH, None) == {"grade_breakdown": {"exams": "100%"}}
+
+        buffer.merge(course_ref(db), {"predicted_grade": 88.0})
+        assert buffer.overlay(PATH, None, field_paths=["predicted_grade"]) == {"predicted_grade": 88.0}
+        await replace
+        await asyncio.sleep(0.3)
+        await buffer.stop()
+
+    asyncio.run(run())
+
+    assert db.docs[PATH] == {"grade_breakdown": {"exams": "100%"}, "predicted_grade": 88.0}
+
+
+def test_set_waits_for_an_in_flight_flush_of_the_same_document():
+    db = FakeFirestore(latency=0.1)
+
+    async def run():
+        buffer = WriteBehindBuffer(db, quiet_period=0.0)
+        buffer.merge(course_ref(db), {"predicted_grade": 60.0})
+        await asyncio.sleep(0.02)
+        assert buffer.stats()["flushing"] == 1
+        await buffer.set(course_ref(db), {"grade_breakdown": {"exams": "100%"}})
+        await buffer.stop()
+
+    asyncio.run(run())
+
+    assert db.docs[PATH] == {"grade_breakdown": {"exams": "100%"}}
@@ -0,0 +1,225 @@
+import asyncio
+import logging
+import time
+
+from executors import run_firestore
+from metrics import Counter, Gauge, register
+
+logger = logging.getLogger(__name__)
+
+FIRESTORE_BATCH_LIMIT = 500
+
+buffered_writes_total = register(Counter(
+    "buffered_writes_total", "Buffered document merges: accepted, coalesced into a pending write, or flushed.",
+    labels=("outcome",)))
+
+
+class _PendingWrite:
+    __slots__ = ("ref", "data", "first_at", "last_at")
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.data = {}
+        self.first_at = self.last_at = time.monotonic()
+
+
+class WriteBehindBuffer:
+    """
+    Debounces `set(..., merge=True)` writes to the same document.
+
+    `merge(ref, data)` folds the fields into a pending write for that
+    document and returns without touching Firestore. A pending write is
+    flushed once it has been quiet for `quiet_period` seconds, or at most
+    `max_delay` seconds after its first change, together with every other
+    due write in batches of up to 500. A failed flush is retried, with any
+    newer fields for the same document taking precedence.
+
+    Reads made through this worker see buffered fields via `overlay()`, so
+    the API stays read-your-writes. Other workers see them after the flush.
+    `on_merge(ref, data)`, if given, is called for every accepted merge.
+    Whole-document replaces go through `set()` so they stay ordered with the
+    buffered merges for the same document: earlier merges are dropped or
+    land first, later ones wait for the replace, and `overlay()` serves the
+    replacement while it is being written.
+    """
+
+    def __init__(self, db, quiet_period=1.0, max_delay=5.0, retry_delay=2.0, on_merge=None):
+        self.db = db
+        self.quiet_period = quiet_period
+        self.max_delay = max_delay
+        self.retry_delay = retry_delay
+        self.on_merge = on_merge
+
+        self._pending = {}
+        self._flushing = {}
+        self._replacing = {}
+        self._wakeup = None
+        self._flushed = asyncio.Condition()
+        self._task = None
+        self.flushes = 0
+        self.failed_flushes = 0
+
+        register(Gauge("write_buffer_pending", "Documents with buffered writes awaiting a flush.", (),
+                       lambda: [((), len(self._pending) + len(self._flushing))]))
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Nothing buffered may be lost on shutdown
+        while self._pending:
+            if not await self._flush(list(self._pending)):
+                logger.error("Dropping buffered writes at shutdown", extra={"documents": len(self._pending)})
+                break
+
+    def merge(self, ref, data):
+        """Buffer `data` to be merged into the document at `ref`."""
+        pending = self._pending.get(ref.path)
+        if pending is None:
+            pending = self._pending[ref.path] = _PendingWrite(ref)
+        else:
+            buffered_writes_total.inc("coalesced")
+        pending.data.update(data)
+        pending.last_at = time.monotonic()
+        buffered_writes_total.inc("accepted")
+        if self.on_merge is not None:
+            self.on_merge(ref, data)
+        # Started lazily so scripts that skip the app lifespan still flush
+        self.start()
+        self._wakeup.set()
+
+    def overlay(self, path, data, field_paths=None):
+        """
+        `data` as read from Firestore for document `path` (None if missing),
+        with buffered fields applied on top. `field_paths` limits the overlay
+        to the fields a masked read asked for.
+        """
+        replacing = self._replacing.get(path)
+        if replacing is not None:
+            # Firestore may not have the replacement yet, and anything still flushing predates it
+            data, sources = dict(replacing), (self._pending,)
+            if field_paths is not None:
+                data = {key: value for key, value in data.items() if key in field_paths}
+        else:
+            sources = (self._flushing, self._pending)
+
+        buffered = {}
+        for source in sources:
+            if path in source:
+                buffered.update(source[path].data)
+        if field_paths is not None:
+            buffered = {key: value for key, value in buffered.items() if key in field_paths}
+        if not buffered:
+            return data
+        return dict(data or {}, **buffered)
+
+    async def set(self, ref, data):
+        """
+        Replace the document at `ref` with `data` right away. Buffered merges
+        for it are dropped, and one already being flushed lands first, so
+        neither is applied on top of the new document. Merges made while the
+        replace is in flight are held back and flushed after it.
+        """
+        self._pending.pop(ref.path, None)
+        self._replacing[ref.path] = data
+        try:
+            if ref.path in self._flushing:
+                async with self._flushed:
+                    await self._flushed.wait_for(lambda: ref.path not in self._flushing)
+            await run_firestore(ref.set, data)
+        finally:
+            del self._replacing[ref.path]
+            if ref.path in self._pending and self._wakeup is not None:
+                self._wakeup.set()
+
+    def _due(self, now):
+        return [path for path, pending in self._pending.items()
+                if path not in self._replacing
+                and (now - pending.last_at >= self.quiet_period or now - pending.first_at >= self.max_delay)]
+
+    def _next_due_in(self, now):
+        """Seconds until the next write is due, or None if every pending write waits on a replace."""
+        return min((max(0.0, min(pending.last_at + self.quiet_period, pending.first_at + self.max_delay) - now)
+                    for path, pending in self._pending.items() if path not in self._replacing), default=None)
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            now = time.monotonic()
+            due = self._due(now)
+            if not due:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self._next_due_in(now))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if not await self._flush(due):
+                await asyncio.sleep(self.retry_delay)
+
+    async def _flush(self, paths):
+        writes = [self._pending.pop(path) for path in paths]
+        for pending in writes:
+            self._flushing[pending.ref.path] = pending
+
+        def commit():
+            for start in range(0, len(writes), FIRESTORE_BATCH_LIMIT):
+                batch = self.db.batch()
+                for pending in writes[start:start + FIRESTORE_BATCH_LIMIT]:
+                    batch.set(pending.ref, pending.data, merge=True)
+                batch.commit()
+
+        try:
+            await run_firestore(commit)
+        except asyncio.CancelledError:
+            # Merges are idempotent, so requeueing a batch that did land is harmless
+            self._requeue(writes)
+            await self._notify_flushed()
+            raise
+        except Exception as e:
+            self.failed_flushes += 1
+            logger.warning("Buffered write flush failed", extra={"documents": len(writes), "error": str(e)})
+            self._requeue(writes)
+            await self._notify_flushed()
+            return False
+
+        self.flushes += 1
+        buffered_writes_total.inc("flushed", amount=len(writes))
+        for pending in writes:
+            del self._flushing[pending.ref.path]
+        await self._notify_flushed()
+        return True
+
+    async def _notify_flushed(self):
+        async with self._flushed:
+            self._flushed.notify_all()
+
+    def _requeue(self, writes):
+        for pending in writes:
+            del self._flushing[pending.ref.path]
+            if pending.ref.path in self._replacing:
+                # The document is being replaced; the failed fields predate it
+                continue
+            newer = self._pending.get(pending.ref.path)
+            if newer is not None:
+                # Fields written since the flush started win over the failed ones
+                pending.data.update(newer.data)
+                pending.last_at = newer.last_at
+            self._pending[pending.ref.path] = pending
+
+    def stats(self):
+        return {
+            "pending": len(self._pending),
+            "flushing": len(self._flushing),
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+        }
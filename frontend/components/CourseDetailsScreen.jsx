@@ -3,6 +3,12 @@ import { View, Text, StyleSheet, ScrollView, TouchableOpacity, ActivityIndicator
 import * as DocumentPicker from 'expo-document-picker';
 import SegmentedControlTab from 'react-native-segmented-control-tab';
 
+// Give up on a syllabus parse after this long; the backend caps each long-poll at 20s
+const SYLLABUS_POLL_TIMEOUT_MS = 5 * 60 * 1000;
+const SYLLABUS_POLL_MAX_DELAY_MS = 5000;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 const CourseDetailsScreen = ({ user, route }) => {
   const { className, id } = route.params;
   const [courseDetails, setCourseDetails] = useState(null);
@@ -23,6 +29,32 @@ const CourseDetailsScreen = ({ user, route }) => {
     fetchAllAssignments(id, user.id);
   }, [className]);
 
+  // Grade and assignment changes are pushed by the backend instead of re-polled
+  useEffect(() => {
+    const socket = new WebSocket(`ws://10.2.14.245:8000/ws/grades/${user.uid}`);
+    socket.onmessage = (message) => {
+      const event = JSON.parse(message.data);
+      if (event.type === 'grade' && event.class_name === className) {
+        if (event.predicted_grade !== undefined) setPredictedGrade(event.predicted_grade);
+      } else if (event.type === 'assignments' && String(event.course_id) === String(id)) {
+        setAssignments((current) => {
+          const changed = new Map(event.changed.map((a) => [String(a.id), a]));
+          const removed = new Set(event.removed.map(String));
+          const kept = current
+            .filter((a) => !removed.has(String(a.id)))
+            .map((a) => changed.get(String(a.id)) || a);
+          const known = new Set(kept.map((a) => String(a.id)));
+          return kept.concat(event.changed.filter((a) => !known.has(String(a.id))));
+        });
+      } else if (event.type === 'resync') {
+        fetchCourseDetails();
+        fetchAllAssignments(id, user.id);
+      }
+    };
+    socket.onerror = (error) => console.warn('Grade updates unavailable:', error.message);
+    return () => socket.close();
+  }, [className, user.uid]);
+
   useEffect(() => {
     if (courseDetails) {
       setGradeStyle(courseDetails.grade_style || 'raw');
@@ -70,22 +102,14 @@ const CourseDetailsScreen = ({ user, route }) => {
       setLoadingAssignments(true);
       setAssignments([]);
       
-      // Fetch both Canvas and Gradescope assignments in parallel
-      const [canvasResponse, gradescopeResponse] = await Promise.all([
-        fetch(`http://10.2.14.245:8000/get_assignments?course_id=${courseId}&user_id=${userId}`),
-        fetch(`http://10.2.14.245:8000/get_gradescope_assignments?course_id=${courseId}`)
-      ]);
-
-      const canvasData = await canvasResponse.json();
-      const gradescopeData = await gradescopeResponse.json();
-
-      // Combine assignments from both sources
-      const allAssignments = [
-        ...canvasData.assignments,
-        ...gradescopeData.assignments
-      ];
-
-      setAssignments(allAssignments);
+      // Canvas and Gradescope are fetched and merged server-side in one call
+      const response = await fetch(`http://10.2.14.245:8000/get_course_assignments?course_id=${courseId}&user_id=${userId}`);
+      const data = await response.json();
+      if (data.partial) {
+        console.warn('Some assignment sources failed:', data.sources);
+      }
+
+      setAssignments(data.assignments || []);
     } catch (error) {
       console.error('Error fetching assignments:', error);
     } finally {
@@ -114,8 +138,33 @@ const CourseDetailsScreen = ({ user, route }) => {
         },
       });
 
-      const data = await response.json();
-      console.log('Upload response:', data);
+      let job = await response.json();
+      if (!response.ok) {
+        throw new Error(job.detail || 'Failed to upload the file');
+      }
+
+      // Parsing runs in the background; long-poll until the job finishes, backing off between polls
+      const pollDeadline = Date.now() + SYLLABUS_POLL_TIMEOUT_MS;
+      let pollDelay = 500;
+      while (job.status !== 'done' && job.status !== 'failed') {
+        if (Date.now() > pollDeadline) {
+          throw new Error('Timed out waiting for the syllabus to be parsed');
+        }
+        const statusResponse = await fetch(`http://10.2.14.245:8000/syllabus-parse/${job.job_id}?wait=20`);
+        const status = await statusResponse.json();
+        if (!statusResponse.ok) {
+          throw new Error(status.detail || 'Failed to check the syllabus parse status');
+        }
+        job = status;
+        if (job.status !== 'done' && job.status !== 'failed') {
+          await sleep(pollDelay);
+          pollDelay = Math.min(pollDelay * 2, SYLLABUS_POLL_MAX_DELAY_MS);
+        }
+      }
+      console.log('Syllabus parse job:', job);
+      if (job.status === 'failed') {
+        throw new Error(job.error || 'Failed to parse the syllabus');
+      }
       Alert.alert('Success', 'File uploaded successfully.');
 
       // ⬇️ Immediately re-fetch the course details after upload
@@ -146,83 +195,22 @@ const CourseDetailsScreen = ({ user, route }) => {
         }),
       });
 
-      // Then calculate grade locally
-      const gradeBreakdown = courseDetails.grade_breakdown || {};
-      
-      // Categorize assignments
-      const categorizeAssignment = (assignmentName) => {
-        const name = assignmentName.toLowerCase();
-        for (const category of Object.keys(gradeBreakdown)) {
-          if (name.includes(category.toLowerCase())) {
-            return category;
-          }
-        }
-        // fallback: try to guess
-        if (name.includes('quiz')) return 'quizzes';
-        if (name.includes('homework') || name.includes('hw')) return 'homework';
-        if (name.includes('midterm')) {
-          return name.includes('1') ? 'midterm_1' : (name.includes('2') ? 'midterm_2' : 'midterm');
-        }
-        if (name.includes('final')) return 'final';
-        return null;
-      };
-
-      // Group assignments by category
-      const categoryScores = {};
-      assignments.forEach(assignment => {
-        if (assignment.score !== undefined && assignment.points_possible) {
-          const category = categorizeAssignment(assignment.name);
-          if (!category) return;
-          
-          const percent = (assignment.score / assignment.points_possible) * 100;
-          if (!categoryScores[category]) {
-            categoryScores[category] = [];
-          }
-          categoryScores[category].push(percent);
-        }
-      });
-
-      // Compute averages per category
-      const categoryAverages = {};
-      Object.entries(categoryScores).forEach(([category, scores]) => {
-        if (scores.length > 0) {
-          categoryAverages[category] = scores.reduce((a, b) => a + b, 0) / scores.length;
-        }
-      });
-
-      // Calculate weighted average
-      let weightedSum = 0;
-      let usedWeights = 0;
-      Object.entries(categoryAverages).forEach(([category, avg]) => {
-        const weightStr = gradeBreakdown[category];
-        if (!weightStr) return;
-        const weight = parseFloat(weightStr.replace('%', ''));
-        weightedSum += avg * weight;
-        usedWeights += weight;
-      });
-
-      let calculatedGrade = null;
-      if (usedWeights > 0) {
-        calculatedGrade = weightedSum / usedWeights;
-      }
-
-      // Apply curve if selected
-      if (gradeStyle === 'curved' && calculatedGrade !== null) {
-        calculatedGrade = 85.0; // Simulate curve by treating as median (B-level)
-      }
-
-      setPredictedGrade(calculatedGrade);
-
-      // Save the predicted grade to backend
-      await fetch('http://10.2.14.245:8000/set_predicted_grade', {
+      // Then have the backend recompute and store the grade from the latest scores
+      const response = await fetch('http://10.2.14.245:8000/compute_predicted_grade', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
           user_id: user.uid,
           class_name: className,
-          predicted_grade: calculatedGrade,
+          course_id: String(id),
         }),
       });
+      const data = await response.json();
+      if (!response.ok) {
+        throw new Error(data.detail || 'Failed to compute grade');
+      }
+
+      setPredictedGrade(data.predicted_grade);
 
     } catch (error) {
       console.error('Error calculating grade:', error);
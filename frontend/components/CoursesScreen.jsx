@@ -12,22 +12,18 @@ const CoursesScreen = ({ user }) => {
 
   async function fetchCoursesAndGrades(user) {
     try {
-      const response = await fetch(`http://10.2.14.245:8000/get_user_courses?user_id=${user.uid}`);
+      const response = await fetch(`http://10.2.14.245:8000/get_user_courses_with_grades?user_id=${user.uid}&fields=predicted_grade`);
       const data = await response.json();
-      if (Array.isArray(data)) {
-        setCourses(data);
-        // Fetch predicted grades for each course
-        data.forEach(async (course) => {
-          try {
-            const resp = await fetch(`http://10.2.14.245:8000/user_course/${user.uid}/${course.course_code}`);
-            const courseData = await resp.json();
-            if (courseData.course_found && courseData.course_data && courseData.course_data.predicted_grade !== undefined) {
-              setCourseGrades(prev => ({ ...prev, [course.course_code]: courseData.course_data.predicted_grade }));
-            }
-          } catch (e) {
-            // Ignore errors for missing course details
+      if (Array.isArray(data.courses)) {
+        setCourses(data.courses);
+        // Predicted grades come back in the same response, keyed by course code
+        const grades = {};
+        Object.entries(data.course_data || {}).forEach(([courseCode, courseData]) => {
+          if (courseData && courseData.predicted_grade !== undefined && courseData.predicted_grade !== null) {
+            grades[courseCode] = courseData.predicted_grade;
           }
         });
+        setCourseGrades(grades);
       } else {
         console.error('Unexpected data format:', data);
         setCourses([]);